@@ -105,7 +105,9 @@ export default function AIAdvisor() {
       const result = await getTeamGameStatistics(user?.team_id ?? '');
       
       if (result) {
-        const formattedResult = JSON.parse(result.stats).map((stat: any) => ({
+        // older servers sent the stats as a JSON encoded string
+        const stats = typeof result.stats === 'string' ? JSON.parse(result.stats) : result.stats;
+        const formattedResult = stats.map((stat: any) => ({
           ...stat,
           _id: stat._id.$oid,
           game_date: new Date(stat.game_date.$date).toLocaleDateString(),
@@ -61,7 +61,9 @@ export default function Messages() {
   const [modalVisible, setModalVisible] = useState(false);
   const { user } = useAuth();
   const isManagement = user?.user_type === 'management';
-  const lastMessageTimestamp = useRef<string>('');
+  const lastSyncedAt = useRef<string>('');
+  // syncs overlap a little, so messages already shown can come back
+  const knownMessageIds = useRef<Set<string>>(new Set());
   const pollingInterval = useRef<NodeJS.Timeout>();
   const appState = useRef(AppState.currentState);
   const [expoPushToken, setExpoPushToken] = useState<string>('');
@@ -98,18 +100,31 @@ export default function Messages() {
   };
 
   const checkForNewMessages = async () => {
-    try {
-      const messageBoard = await getTeamMessageBoard(user?.team_id || '');
-      const newMessages = messageBoard?.messages || [];
+    if (!lastSyncedAt.current) {
+      return fetchMessages();
+    }
 
-      if (newMessages.length > 0) {
-        const latestMessage = newMessages[newMessages.length - 1];
+    try {
+      // Only messages posted or edited since the last sync
+      const messageBoard = await getTeamMessageBoard(user?.team_id || '', { since: lastSyncedAt.current });
+      lastSyncedAt.current = messageBoard.synced_at || '';
+      const changedMessages = messageBoard?.messages || [];
+      const latestIsNew = changedMessages.length > 0 && !knownMessageIds.current.has(changedMessages[changedMessages.length - 1].id);
+      changedMessages.forEach(message => knownMessageIds.current.add(message.id));
+
+      if (changedMessages.length > 0) {
+        const changedById = new Map(changedMessages.map(message => [message.id, message]));
+        setMessages(current => {
+          const updated = current.map(message => changedById.get(message.id) || message);
+          const knownIds = new Set(current.map(message => message.id));
+          const added = changedMessages.filter(message => !knownIds.has(message.id));
+          return [...added.reverse(), ...updated];
+        });
 
-        // Check if this is a new message
-        if (latestMessage.created_at !== lastMessageTimestamp.current) {
-          lastMessageTimestamp.current = latestMessage.created_at;
-          setMessages(newMessages.reverse());
+        const latestMessage = changedMessages[changedMessages.length - 1];
 
+        // Check if this is a new message rather than an edit or one already shown
+        if (latestIsNew) {
           // Send notification for the new message
           if (!isManagement) { // Only send notifications to players
             await sendImmediateNotification(latestMessage);
@@ -267,9 +282,8 @@ export default function Messages() {
       setLoading(true);
       const messageBoard = await getTeamMessageBoard(user?.team_id || '');
       const newMessages = messageBoard?.messages || [];
-      if (newMessages.length > 0) {
-        lastMessageTimestamp.current = newMessages[newMessages.length - 1].created_at;
-      }
+      lastSyncedAt.current = messageBoard?.synced_at || '';
+      knownMessageIds.current = new Set(newMessages.map(message => message.id));
       setMessages(newMessages.reverse());
     } catch (error) {
       console.error('Error fetching messages:', error);
@@ -308,9 +322,7 @@ export default function Messages() {
     }
 
     try {
-      // Calculate the correct index from the end of the array
-      const correctIndex = messages.length - 1 - index;
-      const updatedBoard = await updateMessage(user?.team_id || '', correctIndex, newMessage, messageType);
+      const updatedBoard = await updateMessage(user?.team_id || '', messages[index].id, newMessage, messageType);
       setMessages((updatedBoard?.messages || []).reverse());
       setNewMessage('');
       setEditingIndex(null);
@@ -333,9 +345,7 @@ export default function Messages() {
           style: 'destructive',
           onPress: async () => {
             try {
-              // Calculate the correct index from the end of the array
-              const correctIndex = messages.length - 1 - index;
-              await deleteMessage(user?.team_id || '', correctIndex);
+              await deleteMessage(user?.team_id || '', messages[index].id);
               await fetchMessages();
             } catch (error) {
               console.error('Error in delete operation:', error);
@@ -47,7 +47,8 @@ export default function GameStatistics() {
             setError(null);
             try {
                 const response = await axiosInstance.get(`/game_statistics/team_id/${user?.team_id}`);
-                const responseData = JSON.parse(response.data.stats)
+                // older servers sent the stats as a JSON encoded string
+                const responseData = typeof response.data.stats === 'string' ? JSON.parse(response.data.stats) : response.data.stats
 
                 if (response.data && Array.isArray(responseData)) {
                     setAllStats(responseData);
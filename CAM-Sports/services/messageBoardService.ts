@@ -14,11 +14,19 @@ export interface MessageBoard {
     created_at: string;
     last_updated: string;
     messages: Message[];
+    synced_at?: string;
+    before?: string | null;
 }
 
-export const getTeamMessageBoard = async (teamId: string): Promise<MessageBoard> => {
+export interface MessageBoardQuery {
+    limit?: number;
+    before?: string;
+    since?: string;
+}
+
+export const getTeamMessageBoard = async (teamId: string, query: MessageBoardQuery = {}): Promise<MessageBoard> => {
     try {
-        const response = await axiosInstance.get(`/message_board/${teamId}`);
+        const response = await axiosInstance.get(`/message_board/${teamId}`, { params: query });
         return response.data;
     } catch (error) {
         console.error('Error fetching message board:', error);
@@ -54,9 +62,9 @@ export const addMessage = async (teamId: string, content: string, type: string,
     }
 };
 
-export const updateMessage = async (teamId: string, messageIndex: number, content: string, type: string): Promise<MessageBoard> => {
+export const updateMessage = async (teamId: string, messageId: string, content: string, type: string): Promise<MessageBoard> => {
     try {
-        const response = await axiosInstance.put(`/message_board/${teamId}/messages/${messageIndex}`, {
+        const response = await axiosInstance.put(`/message_board/${teamId}/messages/${messageId}`, {
             content,
             type
         });
@@ -67,9 +75,9 @@ export const updateMessage = async (teamId: string, messageIndex: number, conten
     }
 };
 
-export const deleteMessage = async (teamId: string, messageIndex: number): Promise<void> => {
+export const deleteMessage = async (teamId: string, messageId: string): Promise<void> => {
     try {
-        await axiosInstance.delete(`/message_board/${teamId}/messages/${messageIndex}`);
+        await axiosInstance.delete(`/message_board/${teamId}/messages/${messageId}`);
     } catch (error) {
         console.error('Error deleting message:', error);
         throw error;
@@ -1,5 +1,6 @@
 from flask import Flask
 import os
+import atexit
 from dotenv import load_dotenv
 from flask_cors import CORS  # Import CORS
 from flask_apscheduler import APScheduler
@@ -21,6 +22,15 @@ from routes.player import player_bp
 from routes.management import management_bp
 from routes.notifications import notifications_bp
 
+# Background jobs
+from services.stat_events import flush_stat_events, FLUSH_INTERVAL_SECONDS
+from services.notification_queue import start_notification_workers
+from services.push_receipts import check_push_receipts, RECEIPT_CHECK_SECONDS
+from services.notification_digest import send_due_digests, DIGEST_CHECK_SECONDS
+
+# CLI commands
+from commands import rebuild_rollups_command, rebuild_opponents_command, import_stats_command, benchmark_stats_serializer_command, benchmark_analytics_command, benchmark_stats_prompt_command, migrate_message_boards_command, process_notifications_command, check_push_receipts_command, normalize_team_ids_command, migrate_conversations_command
+
 load_dotenv()
 app = Flask(__name__)
 scheduler = APScheduler()
@@ -60,9 +70,38 @@ app.register_blueprint(player_bp, url_prefix='/player')
 app.register_blueprint(management_bp, url_prefix='/management')
 app.register_blueprint(notifications_bp, url_prefix='/notifications')
 
+# CLI commands
+app.cli.add_command(rebuild_rollups_command)
+app.cli.add_command(rebuild_opponents_command)
+app.cli.add_command(import_stats_command)
+app.cli.add_command(benchmark_stats_serializer_command)
+app.cli.add_command(benchmark_analytics_command)
+app.cli.add_command(benchmark_stats_prompt_command)
+app.cli.add_command(migrate_message_boards_command)
+app.cli.add_command(process_notifications_command)
+app.cli.add_command(check_push_receipts_command)
+app.cli.add_command(normalize_team_ids_command)
+app.cli.add_command(migrate_conversations_command)
+
 # Start the scheduler
 scheduler.start()
 
+# Flush buffered live stat events periodically and on shutdown
+scheduler.add_job(id='flush_stat_events', func=flush_stat_events, trigger='interval',
+                  seconds=FLUSH_INTERVAL_SECONDS, replace_existing=True)
+atexit.register(flush_stat_events)
+
+# Check delivery receipts of sent push notifications
+scheduler.add_job(id='check_push_receipts', func=check_push_receipts, trigger='interval',
+                  seconds=RECEIPT_CHECK_SECONDS, replace_existing=True)
+
+# Send notification digests whose window is over
+scheduler.add_job(id='send_due_digests', func=send_due_digests, trigger='interval',
+                  seconds=DIGEST_CHECK_SECONDS, replace_existing=True)
+
+# Send queued push notifications in the background
+start_notification_workers()
+
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 5000))
     app.run(debug=True, host="0.0.0.0", port=port)
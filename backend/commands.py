@@ -0,0 +1,119 @@
+import click
+import threading
+from services.stats_rollup import rebuild_rollups, verify_rollups
+from services.stats_serializer import benchmark_serializers
+from services.stats_analytics import benchmark_analytics
+from services.stats_prompt import compare_prompt_sizes
+from controllers.message_board_controller import MessageBoardController
+from services.stats_opponents import rebuild_opponent_index
+from services.stats_import import read_csv, read_ndjson, import_games
+from services.notification_queue import process_pending_jobs, run_worker
+from services.push_receipts import check_push_receipts
+from services.push_recipients import normalize_team_ids
+from services.conversation_store import migrate_conversations
+
+
+@click.command('rebuild-rollups')
+@click.option('--team-id', default=None, help='Only rebuild the rollups of this team.')
+@click.option('--verify-only', is_flag=True, help='Report inconsistent rollups without rewriting them.')
+def rebuild_rollups_command(team_id, verify_only):
+    """Regenerates the player season rollups from the stored game statistics."""
+    mismatches = verify_rollups(team_id)
+    for key in mismatches:
+        click.echo(f"Inconsistent rollup: team={key[0]} season={key[1]} player={key[2]}")
+    click.echo(f"{len(mismatches)} inconsistent rollups found")
+
+    if not verify_only:
+        count = rebuild_rollups(team_id)
+        click.echo(f"Rebuilt {count} rollups")
+
+
+@click.command('rebuild-opponents')
+@click.option('--team-id', default=None, help='Only rebuild the opponent index of this team.')
+def rebuild_opponents_command(team_id):
+    """Backfills normalized opponent keys and regenerates the opponent summaries."""
+    count = rebuild_opponent_index(team_id)
+    click.echo(f"Rebuilt {count} opponent summaries")
+
+
+@click.command('import-stats')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(['csv', 'ndjson']), default=None, help='Defaults to the file extension.')
+@click.option('--team-id', default=None, help='Import every game into this team.')
+def import_stats_command(path, import_format, team_id):
+    """Bulk imports game statistics from a CSV or NDJSON file."""
+    import_format = import_format or ('csv' if path.endswith('.csv') else 'ndjson')
+    with open(path, encoding='utf-8', newline='') as lines:
+        records = read_csv(lines) if import_format == 'csv' else read_ndjson(lines)
+        result = import_games(records, team_id=team_id)
+
+    for error in result['errors']:
+        click.echo(f"Row {error['row']}: {error['error']}")
+    click.echo(f"Imported {result['inserted']} games, {len(result['errors'])} errors")
+
+
+@click.command('benchmark-stats-serializer')
+@click.option('--team-id', required=True, help='Team whose games are serialized.')
+@click.option('--repeat', default=20, help='Number of runs to average.')
+def benchmark_stats_serializer_command(team_id, repeat):
+    """Compares the legacy to_json() statistics serialization with the raw dict serializer."""
+    for name, result in benchmark_serializers(team_id, repeat).items():
+        click.echo(f"{name}: {result['avg_ms']} ms, {result['bytes']} bytes")
+
+
+@click.command('benchmark-analytics')
+@click.option('--games', default=5000, help='Number of synthetic games.')
+@click.option('--players', default=14, help='Number of players per game.')
+def benchmark_analytics_command(games, players):
+    """Times the vectorized analytics on a synthetic game history."""
+    for name, avg_ms in benchmark_analytics(games, players).items():
+        click.echo(f"{name}: {avg_ms} ms")
+
+
+@click.command('benchmark-stats-prompt')
+@click.option('--team-id', required=True, help='Team whose games are encoded.')
+def benchmark_stats_prompt_command(team_id):
+    """Compares the prompt tokens of the JSON game payload with the compact game encoding."""
+    results = compare_prompt_sizes(team_id)
+    click.echo(f"{results['games']} games")
+    for name in ('legacy', 'json', 'compact'):
+        click.echo(f"{name}: {results[name]['tokens']} tokens, {results[name]['bytes']} bytes")
+    click.echo(f"compact encoding saves {results['reduction_percent']}% of the JSON tokens")
+
+
+@click.command('migrate-message-boards')
+def migrate_message_boards_command():
+    """Moves message board messages from the embedded list into message buckets."""
+    count = MessageBoardController.migrate_embedded_messages()
+    click.echo(f"Migrated {count} message boards")
+
+
+
+@click.command('process-notifications')
+@click.option('--watch', is_flag=True, help='Keep processing new jobs instead of exiting once the queue is empty.')
+def process_notifications_command(watch):
+    """Sends queued push notification jobs, for running workers outside the web process."""
+    if watch:
+        run_worker(threading.Event())
+    else:
+        click.echo(f"Processed {process_pending_jobs()} notification jobs")
+
+
+@click.command('check-push-receipts')
+@click.option('--delay', default=None, type=int, help='Only check tickets at least this many seconds old.')
+def check_push_receipts_command(delay):
+    """Fetches pending Expo push receipts and clears tokens of unregistered devices."""
+    summary = check_push_receipts() if delay is None else check_push_receipts(delay)
+    click.echo(f"Checked {summary['checked']} receipts: {summary['ok']} ok, {summary['error']} errors, {summary['pruned']} tokens cleared")
+
+
+@click.command('normalize-team-ids')
+def normalize_team_ids_command():
+    """Converts player and manager team ids stored as strings to ObjectIds."""
+    click.echo(f"Normalized the team id of {normalize_team_ids()} users")
+
+
+@click.command('migrate-conversations')
+def migrate_conversations_command():
+    """Moves AI advisor conversation histories from the embedded list into conversation turns."""
+    click.echo(f"Migrated {migrate_conversations()} conversations")
@@ -1,83 +1,154 @@
-from flask import request, jsonify
+from flask import Response, request, jsonify, stream_with_context
 import os
 import json
-from datetime import datetime
-from services.ai_advior import get_response
-from controllers.game_statistics import get_game_statistics_by_id
+from services.ai_advior import get_response, stream_response
+from services.ai_cache import ai_response_cache, analysis_cache_key
+from services.ai_context import build_context
+from bson import ObjectId
+from models.game_statistics import GameStatistics
+from services.stats_prompt import encode_game
 from controllers.training_plans import get_training_plan_by_id
-from models.conversation import Conversation
+from services.conversation_store import (
+    MAX_HISTORY_PAGE, append_turns, context_turns, delete_temp_turns, get_conversation,
+    load_turns, save_summary, system_turns, turn_json
+)
 
 def load_conv_history():
     email = request.args.get('email')
     user_type = request.args.get('user_type')
+    # ?limit= returns only the newest turns, ?before= the turns older than a previous page
+    limit = request.args.get('limit', type=int)
+    before = request.args.get('before', type=int)
 
     if not email or not user_type:
         return jsonify({"error": "Missing email or user_type parameter"}), 400
+    if limit is not None and not 0 < limit <= MAX_HISTORY_PAGE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_HISTORY_PAGE}"}), 400
 
-    conversation = Conversation.objects(email=email, user_type=user_type).first()
-    if conversation:
-        return jsonify({"conversation_history": conversation.history}), 200
-    else:
-        return jsonify({"conversation_history": []}), 200
-
-def message_ai_advisor():
+    conversation = get_conversation(email, user_type)
+    if not conversation:
+        return jsonify({"conversation_history": [], "before": None}), 200
+
+    turns, previous_before = load_turns(conversation, limit, before)
+    return jsonify({
+        "conversation_history": [turn_json(turn) for turn in turns],
+        "before": previous_before
+    }), 200
+
+def advisor_context(conversation, question):
+    summary_upto = conversation.summary_upto
+    context = build_context(conversation, context_turns(conversation), question)
+    if conversation.summary_upto != summary_upto:
+        save_summary(conversation)
+    return context
+
+def prepare_ai_advisor_turn():
+    """Validates a message request and resolves the prompt it sends.
+
+    Returns (conversation, question, cache key, None), or (None, None, None, error response) when
+    the request can't be answered. Only document analyses have a cache key, text questions get None.
+    """
     email = request.json.get('email')
     user_type = request.json.get('user_type')
     conv_message_type = request.json.get("type")
     message = request.json.get("message")
-    is_temp = request.json.get("isTemp", False)
     
     if not all([email, user_type, conv_message_type, message]):
-        return jsonify({"error": "Missing required fields"}), 400
-
-    conversation = Conversation.objects(email=email, user_type=user_type).first()
-    if not conversation:
-        conversation = Conversation(email=email, user_type=user_type, history=[
-            {"role": "system", "content": os.getenv("OPENAI_STATISTICS_OVERVIEW_ROLE")}
-        ])
-        conversation.save()
+        return None, None, None, (jsonify({"error": "Missing required fields"}), 400)
 
-    history = conversation.history.copy()
+    conversation = get_conversation(email, user_type, create_with=[
+        {"role": "system", "content": os.getenv("OPENAI_STATISTICS_OVERVIEW_ROLE")}
+    ])
 
     if conv_message_type == "text":
-        response = get_response(history, message)
+        question = message
     elif conv_message_type == "statistic_doc_id":
-        game_statistics_response, status_code = get_game_statistics_by_id(message)
-        if status_code == 200:
-            game_statistics_json = game_statistics_response.get_json()
-            game_statistics = json.dumps(game_statistics_json)
-            response = get_response(history, game_statistics)
-        else:
-            return game_statistics_response
+        game_statistics = None
+        if ObjectId.is_valid(message):
+            game_statistics = GameStatistics.objects(id=message).as_pymongo().first()
+        if game_statistics is None:
+            return None, None, None, (jsonify({"error": "Game statistics not found"}), 404)
+        # compact tables instead of the JSON document, a fraction of the prompt tokens
+        question = encode_game(game_statistics)
     elif conv_message_type == "training_plan_id":
         training_plan_response, status_code = get_training_plan_by_id(message)
-        if status_code == 200:
-            training_plan_json = training_plan_response.get_json()
-            training_plan = json.dumps(training_plan_json)
-            response = get_response(history, training_plan)
-        else:
-            return training_plan_response
+        if status_code != 200:
+            return None, None, None, training_plan_response
+        training_plan_json = training_plan_response.get_json()
+        question = json.dumps(training_plan_json)
     else:
-        return jsonify({"error": "Invalid conversation message type"}), 400
+        return None, None, None, (jsonify({"error": "Invalid conversation message type"}), 400)
+
+    cache_key = None
+    if conv_message_type != "text":
+        system_messages = system_turns(conversation)
+        cache_key = analysis_cache_key(system_messages, conv_message_type, message, question)
 
-    # Add user message
-    message_obj = {"role": "user", "content": message}
-    if is_temp:
-        message_obj["isTemp"] = True
-    history.append(message_obj)
+    return conversation, question, cache_key, None
 
-    # Add assistant message
-    message_obj = {"role": "assistant", "content": response}
-    if is_temp:
-        message_obj["isTemp"] = True
-    history.append(message_obj)
+def save_ai_advisor_turn(conversation, message, response, is_temp):
+    # Append the user and assistant messages, temporary ones expire on their own if never cleaned
+    append_turns(conversation, [
+        {"role": "user", "content": message, "isTemp": is_temp},
+        {"role": "assistant", "content": response, "isTemp": is_temp}
+    ])
 
-    conversation.history = history
-    conversation.last_updated = datetime.utcnow()
-    conversation.save()
+def message_ai_advisor():
+    conversation, question, cache_key, error = prepare_ai_advisor_turn()
+    if error:
+        return error
+
+    # an unchanged document analysed before is answered without a model call
+    response = ai_response_cache.get(cache_key) if cache_key else None
+    if not response:
+        response = get_response(advisor_context(conversation, question), question)
+        # an empty answer is a failed one, it must not be served for the rest of the TTL
+        if cache_key and response:
+            ai_response_cache.set(cache_key, response)
+    save_ai_advisor_turn(conversation, request.json.get("message"), response, request.json.get("isTemp", False))
 
     return jsonify({"message": response}), 200
 
+def stream_ai_advisor():
+    """Relays the answer as Server-Sent Events while it is generated.
+
+    Every piece is a `data: {"delta": ...}` event; the stream ends with a `done` event carrying
+    the whole message, which is only then saved to the conversation history.
+    """
+    conversation, question, cache_key, error = prepare_ai_advisor_turn()
+    if error:
+        return error
+
+    message = request.json.get("message")
+    is_temp = request.json.get("isTemp", False)
+    # empty entries cached before they were skipped count as misses
+    cached = (ai_response_cache.get(cache_key) or None) if cache_key else None
+    # a cached answer is relayed as a single piece
+    deltas = [cached] if cached is not None else stream_response(advisor_context(conversation, question), question)
+
+    def events():
+        parts = []
+        try:
+            for delta in deltas:
+                parts.append(delta)
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        except Exception as e:
+            print(f"Error streaming AI advisor response: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to get a response'})}\n\n"
+            return
+
+        response = ''.join(parts)
+        if cache_key and cached is None and response:
+            ai_response_cache.set(cache_key, response)
+        save_ai_advisor_turn(conversation, message, response, is_temp)
+        yield f"event: done\ndata: {json.dumps({'message': response})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 def customize_ai_advisor():
     email = request.json.get('email')
     user_type = request.json.get('user_type')
@@ -86,13 +157,8 @@ def customize_ai_advisor():
     if not all([email, user_type, submitted_text]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    conversation = Conversation.objects(email=email, user_type=user_type).first()
-    if not conversation:
-        conversation = Conversation(email=email, user_type=user_type)
-
-    conversation.history.append({"role": "system", "content": submitted_text})
-    conversation.last_updated = datetime.utcnow()
-    conversation.save()
+    conversation = get_conversation(email, user_type, create_with=[])
+    append_turns(conversation, [{"role": "system", "content": submitted_text}])
 
     return jsonify({"success": True, "message": "System message added successfully"}), 200
 
@@ -103,13 +169,14 @@ def clean_temp_messages():
     if not all([email, user_type]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    conversation = Conversation.objects(email=email, user_type=user_type).first()
+    conversation = get_conversation(email, user_type)
     if not conversation:
         return jsonify({"error": "Conversation not found"}), 404
 
-    # Filter out messages that have isTemp flag
-    conversation.history = [msg for msg in conversation.history if not msg.get('isTemp')]
-    conversation.last_updated = datetime.utcnow()
-    conversation.save()
+    # Temporary turns are flagged, so this is a single indexed delete
+    delete_temp_turns(conversation)
 
     return jsonify({"success": True, "message": "Temporary messages cleaned successfully"}), 200
+
+def get_ai_cache_stats():
+    return jsonify(ai_response_cache.stats()), 200
@@ -1,47 +1,34 @@
-from flask import request, jsonify
-from models.game_statistics import GameStatistics, SetScore, PlayerStats, AttackStats, ServeStats, ServeReceivesStats, DigsStats, SettingStats, BlocksStats
+from flask import request, jsonify, Response, stream_with_context
+from models.game_statistics import GameStatistics
 import datetime
+import io
 from bson import ObjectId
+from pymongo.errors import OperationFailure
 import mongoengine as me
+from services.stats_aggregation import filter_games, aggregate_season
+from services.stats_rollup import update_rollups, get_team_rollups
+from services.stats_update import build_set_operators, build_inc_operators, update_game, VersionConflict
+from services.stat_events import event_increments, stat_event_buffer
+from services.stats_serializer import json_response, serialize_game, serialize_games
+from services.stats_listing import list_team_games
+from services.stats_opponents import update_opponent_index, get_opponent_summaries, get_opponent_history
+from services.stats_import import build_game_statistics, read_csv, read_ndjson, import_games
+from services.stats_export import export_team_games
+from services.stats_analytics import StatMatrix, rolling_average, percentiles, compare_players, set_trends
 
 
 def create_game_statistics(request):
 
     # extract required data
     data = request.get_json()
-    team_id = data.get('team_id')
-    opposite_team_name = data.get('opposite_team_name')
-    game_date = datetime.datetime.fromisoformat(data.get('game_date').replace('Z', '+00:00'))
-
-    # optionals
-    team_sets_won_count = data.get('team_sets_won_count', 0)
-    team_sets_lost_count = data.get('team_sets_lost_count', 0)
-    sets_scores = {str(k): SetScore(**v) for k, v in data.get('sets_scores', {}).items()}
-    team_stats = {
-        player_id: PlayerStats(
-            position=stats.get('position', ''),
-            starter=stats.get('starter', True),
-            attack=AttackStats(**stats.get('attack', {})),
-            serve=ServeStats(**stats.get('serve', {})),
-            serve_recieves=ServeReceivesStats(**stats.get('serve_recieves', {})),
-            digs=DigsStats(**stats.get('digs', {})),
-            setting=SettingStats(**stats.get('setting', {})),
-            blocks=BlocksStats(**stats.get('blocks', {}))
-        ) for player_id, stats in data.get('team_stats', {}).items()
-    }
 
     # create the statistics document
-    game_statistics = GameStatistics(
-        team_id=team_id,
-        opposite_team_name=opposite_team_name,
-        game_date=game_date,
-        team_sets_won_count=team_sets_won_count,
-        team_sets_lost_count=team_sets_lost_count,
-        sets_scores=sets_scores,
-        team_stats=team_stats
-    )
+    game_statistics = build_game_statistics(data)
     game_statistics.save()
     game_id = str(game_statistics.id)
+    new_game = game_statistics.to_mongo().to_dict()
+    update_rollups(None, new_game)
+    update_opponent_index(None, new_game)
 
     print(game_id)
     return jsonify({"message": "Game statistics created successfully", "game_id": game_id})
@@ -49,32 +36,105 @@ def create_game_statistics(request):
 
 def get_game_statistics_by_id(game_id):
     try:
-        # Query the database for the document by its _id
-        game_statistics = GameStatistics.objects.get(id=ObjectId(game_id))
-
-        # Convert the document to JSON
-        game_statistics_json = game_statistics.to_json()
+        # Query the database for the raw document by its _id
+        game_statistics = GameStatistics.objects(id=ObjectId(game_id)).as_pymongo().first()
+        if game_statistics is None:
+            return jsonify({"error": "Game statistics not found"}), 404
 
         # Return the document as a JSON response
-        return jsonify(game_statistics_json), 200
-    except GameStatistics.DoesNotExist:
-        return jsonify({"error": "Game statistics not found"}), 404
+        return json_response(serialize_game(game_statistics)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def get_game_statistics_by_team_id(team_id):
+def get_game_statistics_by_team_id(team_id, args):
     try:
-        # Query the database for the document by its _id
-        game_statistics = GameStatistics.objects(team_id=team_id)
+        limit = int(args['limit']) if args.get('limit') else None
+        game_statistics, next_cursor = list_team_games(
+            team_id,
+            fields=args.get('fields', 'full'),
+            sort=args.get('sort', '-game_date'),
+            limit=limit,
+            cursor=args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Return the documents as a JSON response
+        return json_response({"stats": serialize_games(game_statistics), "next_cursor": next_cursor}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Convert the document to JSON
-        game_statistics_json = game_statistics.to_json()
 
-        # Return the document as a JSON response
-        return jsonify({"stats": game_statistics_json}), 200
-    except GameStatistics.DoesNotExist:
-        return jsonify({"error": "Game statistics not found"}), 404
+def parse_date_arg(value):
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def get_team_season_aggregate(team_id, args):
+    try:
+        start_date = parse_date_arg(args.get('start_date'))
+        end_date = parse_date_arg(args.get('end_date'))
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    try:
+        games = filter_games(team_id, start_date, end_date, args.get('opponent'))
+        season = aggregate_season(games)
+
+        return jsonify({"team_id": team_id, **season}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def get_team_player_rollups(team_id, args):
+    try:
+        rollups = get_team_rollups(team_id, args.get('season'))
+
+        return jsonify({"team_id": team_id, "players": rollups}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def get_team_analytics(team_id, analysis, args):
+    try:
+        if analysis == 'sets':
+            return jsonify({"team_id": team_id, "sets": set_trends(team_id)}), 200
+
+        matrix = StatMatrix.load(team_id)
+        if analysis == 'rolling':
+            window = int(args.get('window', 5))
+            values = rolling_average(matrix, args.get('player_id'), args.get('stat', 'kill_percentage'), window)
+            return jsonify({"team_id": team_id, "player_id": args.get('player_id'), "window": window, "values": values}), 200
+        if analysis == 'percentiles':
+            return jsonify({"team_id": team_id, **percentiles(matrix, args.get('stat', 'kill_percentage'))}), 200
+        if analysis == 'compare':
+            return jsonify({"team_id": team_id, **compare_players(matrix, args.get('player_a'), args.get('player_b'))}), 200
+
+        return jsonify({"error": "Unknown analysis"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def get_team_opponents(team_id):
+    try:
+        return jsonify({"team_id": team_id, "opponents": get_opponent_summaries(team_id)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def get_team_opponent_history(team_id, opponent_name):
+    try:
+        history = get_opponent_history(team_id, opponent_name)
+        if history is None:
+            return jsonify({"error": "No games against this opponent"}), 404
+
+        history['games'] = serialize_games(history['games'])
+        return json_response({"team_id": team_id, **history}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -85,7 +145,10 @@ def delete_game_statistics_by_id(game_id):
         game_statistics = GameStatistics.objects.get(id=ObjectId(game_id))
 
         # Delete the document
+        old_game = game_statistics.to_mongo().to_dict()
         game_statistics.delete()
+        update_rollups(old_game, None)
+        update_opponent_index(old_game, None)
 
         return jsonify({"message": "Game statistics deleted successfully"}), 200
     except GameStatistics.DoesNotExist:
@@ -94,60 +157,104 @@ def delete_game_statistics_by_id(game_id):
         return jsonify({"error": str(e)}), 500
 
 
-def recursive_update(original, updates):
-    for key, value in updates.items():
-        if isinstance(value, dict) and hasattr(original, key):
-            original_value = getattr(original, key)
-            if isinstance(original_value, (dict, me.EmbeddedDocument)):
-                recursive_update(original_value, value)
-            else:
-                setattr(original, key, value)
-        else:
-            setattr(original, key, value)
-
-
 def update_game_statistics(request):
     data = request.get_json()
     id = data.get('id')
-    print("here", data)
 
     if not id:
         return jsonify({"error": "id is required"}), 400
 
     try:
-        # Query the database for the document by its _id
-        game_statistics = GameStatistics.objects.get(id=ObjectId(id))
-
-        # Fields that cannot be modified
-        immutable_fields = ['_id', 'game_date', 'team_id']
-
-        # Update the document with the provided fields
-        for key, value in data.items():
-            if key not in immutable_fields:
-                if key == 'sets_scores':
-                    # Convert sets_scores to SetScore embedded documents with string keys
-                    value = {str(k): SetScore(**v) for k, v in value.items()}
-                    game_statistics.sets_scores = value
-                elif key == 'team_stats':
-                    # Convert team_stats to PlayerStats embedded documents
-                    for player_id, player_stats in value.items():
-                        if player_id in game_statistics.team_stats:
-                            recursive_update(game_statistics.team_stats[player_id], player_stats)
-                        else:
-                            game_statistics.team_stats[player_id] = PlayerStats(**player_stats)
-                else:
-                    current_value = getattr(game_statistics, key)
-                    if isinstance(current_value, dict):
-                        recursive_update(current_value, value)
-                    else:
-                        setattr(game_statistics, key, value)
-
-        # Save the updated document
-        game_statistics.save()
-
-        return jsonify({"message": "Game statistics updated successfully"}), 200
-    except GameStatistics.DoesNotExist:
-        return jsonify({"error": "Game statistics not found"}), 404
+        set_operators = build_set_operators(data)
+        inc_operators = build_inc_operators(data.get('increments'))
+    except (ValueError, TypeError, me.ValidationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not set_operators and not inc_operators:
+        return jsonify({"error": "No fields to update"}), 400
+
+    try:
+        result = update_game(id, set_operators, inc_operators, data.get('version'))
+        if result is None:
+            return jsonify({"error": "Game statistics not found"}), 404
+        _, new_game = result
+
+        return jsonify({"message": "Game statistics updated successfully", "version": new_game['version']}), 200
+    except VersionConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except OperationFailure as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(e)
         return jsonify({"error": str(e)}), 500
+
+
+def record_stat_events(request):
+    data = request.get_json() or {}
+    events = data.get('events', [data] if 'action' in data else [])
+
+    if not events:
+        return jsonify({"error": "events are required"}), 400
+
+    # validate the whole batch first, so a rejected batch can simply be resent
+    try:
+        increments = [event_increments(event) for event in events]
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        games_to_flush = set()
+        for game_id, game_increments in increments:
+            if stat_event_buffer.add(game_id, game_increments):
+                games_to_flush.add(game_id)
+
+        if data.get('flush'):
+            games_to_flush.update(game_id for game_id, _ in increments)
+        flushed_games = stat_event_buffer.flush(games_to_flush) if games_to_flush else 0
+
+        return jsonify({"message": "Events recorded successfully", "accepted": len(events), "flushed_games": flushed_games}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def import_game_statistics(request):
+    upload = request.files.get('file')
+    filename = upload.filename if upload else ''
+    import_format = request.args.get('format') or ('csv' if filename.endswith('.csv') else 'ndjson')
+
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    try:
+        # stream the upload line by line instead of reading it into memory
+        stream = upload.stream if upload else request.stream
+        lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        records = read_csv(lines) if import_format == 'csv' else read_ndjson(lines)
+        result = import_games(records, team_id=request.args.get('team_id'))
+
+        return jsonify({"message": "Game statistics imported", **result}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def export_team_game_statistics(team_id, args):
+    export_format = args.get('format', 'ndjson')
+    compress = args.get('gzip', '').lower() in ('1', 'true')
+
+    try:
+        chunks = export_team_games(team_id, export_format, compress)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = f"{team_id}_game_statistics.{export_format}" + (".gz" if compress else "")
+    if compress:
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+
+    # chunked response, the games are read from the cursor while the client downloads
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -1,6 +1,11 @@
 from bson import ObjectId
 from datetime import datetime
-from models.message_board import MessageBoard, Message
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models.message_board import MessageBoard, MessageBucket, Message, MESSAGES_PER_BUCKET
+from services.message_events import message_json, publish_message_event
+
+MAX_MESSAGES_PAGE = 100
 
 class MessageBoardController:
     @staticmethod
@@ -9,80 +14,240 @@ class MessageBoardController:
         existing_board = MessageBoard.objects(team_id=team_id).first()
         if existing_board:
             raise ValueError('Message board already exists for this team')
-            
+
         message_board = MessageBoard(team_id=team_id)
         message_board.save()
         return message_board
 
     @staticmethod
     def get_message_board(team_id):
-        message_board = MessageBoard.objects(team_id=team_id).first()
+        message_board = MessageBoard.objects(team_id=team_id).exclude('messages').first()
         if not message_board:
             raise ValueError('Message board not found')
         return message_board
 
+    @staticmethod
+    def get_messages(team_id, limit=None, before=None, since=None):
+        """Raw messages of a team, oldest first, and the id to pass as `before` for the previous page.
+
+        before keeps only messages posted before that message id, limit only the newest `limit` of them;
+        since keeps only messages posted or edited after that time, skipping buckets untouched since.
+        """
+        collection = MessageBucket._get_collection()
+        query = {'team_id': team_id}
+        if since:
+            query['last_updated'] = {'$gt': since}
+        before_id = None
+        if before:
+            before_id = MessageBoardController._message_object_id(before)
+            bucket = collection.find_one({'team_id': team_id, 'messages.message_id': before_id}, {'bucket_number': 1})
+            if not bucket:
+                raise ValueError('Message not found')
+            query['bucket_number'] = {'$lte': bucket['bucket_number']}
+
+        def changed(message):
+            return not since or message['created_at'] > since or message['last_updated'] > since
+
+        if not limit:
+            messages = []
+            for bucket in collection.find(query, {'messages': 1}, sort=[('bucket_number', 1)]):
+                for message in bucket['messages']:
+                    if message['message_id'] == before_id:
+                        # everything from the before message on is newer
+                        return messages, None
+                    if changed(message):
+                        messages.append(message)
+            return messages, None
+
+        # newest buckets first, stopping as soon as the page and one extra message are found
+        page = []
+        reached_before = before_id is None
+        for bucket in collection.find(query, {'messages': 1}, sort=[('bucket_number', -1)]):
+            for message in reversed(bucket['messages']):
+                if not reached_before:
+                    reached_before = message['message_id'] == before_id
+                    continue
+                if changed(message):
+                    page.append(message)
+            if len(page) > limit:
+                break
+
+        page = page[:limit + 1]
+        previous_before = str(page[limit - 1]['message_id']) if len(page) > limit else None
+        return page[:limit][::-1], previous_before
+
+    @staticmethod
+    def _append_to_bucket(team_id, message):
+        """Pushes a message into the team's newest bucket, starting a new bucket when it is full."""
+        collection = MessageBucket._get_collection()
+        now = datetime.utcnow()
+        while True:
+            bucket = collection.find_one_and_update(
+                {'team_id': team_id, 'appended': {'$lt': MESSAGES_PER_BUCKET}},
+                {'$push': {'messages': message.to_mongo()}, '$inc': {'appended': 1, 'message_count': 1}, '$set': {'last_updated': now}},
+                projection={'bucket_number': 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if bucket:
+                return
+
+            last_bucket = collection.find_one({'team_id': team_id}, {'bucket_number': 1}, sort=[('bucket_number', -1)])
+            try:
+                collection.insert_one({
+                    'team_id': team_id,
+                    'bucket_number': last_bucket['bucket_number'] + 1 if last_bucket else 0,
+                    'appended': 1,
+                    'message_count': 1,
+                    'created_at': now,
+                    'last_updated': now,
+                    'messages': [message.to_mongo()]
+                })
+                return
+            except DuplicateKeyError:
+                # another post started the same bucket first, append to it instead
+                continue
+
+    @staticmethod
+    def message_id_at(team_id, message_index):
+        """Stable id of the message at a board-wide index, for clients still addressing messages by index."""
+        if message_index < 0:
+            raise ValueError('Message not found')
+
+        buckets = MessageBucket.objects(team_id=team_id).order_by('bucket_number').only('message_count').as_pymongo()
+        for bucket in buckets:
+            if message_index < bucket['message_count']:
+                message = MessageBucket._get_collection().find_one(
+                    {'_id': bucket['_id']},
+                    {'messages': {'$slice': [message_index, 1]}, 'messages.message_id': 1}
+                )
+                if message and message['messages']:
+                    return message['messages'][0]['message_id']
+                break
+            message_index -= bucket['message_count']
+        raise ValueError('Message not found')
+
+    @staticmethod
+    def _touch_board(team_id):
+        """Sets last_updated on the board in the same round trip that checks it exists."""
+        message_board = MessageBoard.objects(team_id=team_id).exclude('messages').modify(
+            set__last_updated=datetime.utcnow(), new=True
+        )
+        if not message_board:
+            raise ValueError('Message board not found')
+        return message_board
+
+    @staticmethod
+    def _message_object_id(message_id):
+        if not ObjectId.is_valid(message_id):
+            raise ValueError('Message not found')
+        return ObjectId(message_id)
+
     @staticmethod
     def add_message(team_id, content, message_type, creator_email):
         if not all([content, message_type, creator_email]):
             raise ValueError('Content, type, and creator_email are required')
 
-        message_board = MessageBoard.objects(team_id=team_id).first()  # team_id is the team name
-        if not message_board:
-            raise ValueError('Message board not found')
-            
         new_message = Message(
             content=content,
             type=message_type,
             creator_email=creator_email
         )
-        
-        message_board.messages.append(new_message)
-        message_board.last_updated = datetime.utcnow()
-        message_board.save()
-        return message_board
+        new_message.validate()
+
+        message_board = MessageBoardController._touch_board(team_id)  # team_id is the team name
+        MessageBoardController._append_to_bucket(team_id, new_message)
+        publish_message_event(team_id, 'created', message_json(new_message.to_mongo()))
+        return message_board, new_message
 
     @staticmethod
-    def update_message(team_id, message_index, content=None, message_type=None):
+    def update_message(team_id, message_id, content=None, message_type=None):
         if not content and not message_type:
             raise ValueError('At least one field to update is required')
-            
-        message_board = MessageBoard.objects(team_id=team_id).first()
-        if not message_board:
-            raise ValueError('Message board not found')
-            
-        if message_index >= len(message_board.messages):
-            raise ValueError('Message not found')
-            
-        message = message_board.messages[message_index]
+
+        message_id = MessageBoardController._message_object_id(message_id)
+        now = datetime.utcnow()
+        updates = {'messages.$.last_updated': now, 'last_updated': now}
         if content:
-            message.content = content
+            updates['messages.$.content'] = content
         if message_type:
-            message.type = message_type
-            
-        message.last_updated = datetime.utcnow()
-        message_board.last_updated = datetime.utcnow()
-        message_board.save()
-        return message_board
+            updates['messages.$.type'] = message_type
+
+        # positional update of the matched message only, returning just that message
+        bucket = MessageBucket._get_collection().find_one_and_update(
+            {'team_id': team_id, 'messages.message_id': message_id},
+            {'$set': updates},
+            projection={'messages': {'$elemMatch': {'message_id': message_id}}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not bucket:
+            raise ValueError('Message not found')
+        publish_message_event(team_id, 'updated', message_json(bucket['messages'][0]))
+        return MessageBoardController._touch_board(team_id)
 
     @staticmethod
-    def delete_message(team_id, message_index):
-        message_board = MessageBoard.objects(team_id=team_id).first()
-        if not message_board:
-            raise ValueError('Message board not found')
-            
-        if message_index >= len(message_board.messages):
+    def delete_message(team_id, message_id):
+        message_id = MessageBoardController._message_object_id(message_id)
+        result = MessageBucket._get_collection().update_one(
+            {'team_id': team_id, 'messages.message_id': message_id},
+            {
+                '$pull': {'messages': {'message_id': message_id}},
+                '$inc': {'message_count': -1},
+                '$set': {'last_updated': datetime.utcnow()}
+            }
+        )
+        if result.matched_count == 0:
             raise ValueError('Message not found')
-            
-        message_board.messages.pop(message_index)
-        message_board.last_updated = datetime.utcnow()
-        message_board.save()
-        return message_board
+        publish_message_event(team_id, 'deleted', {'id': str(message_id)})
+        return MessageBoardController._touch_board(team_id)
 
     @staticmethod
     def delete_message_board(team_id):
         message_board = MessageBoard.objects(team_id=team_id).first()
         if not message_board:
             raise ValueError('Message board not found')
-            
+
+        MessageBucket.objects(team_id=team_id).delete()
         message_board.delete()
-        return True 
\ No newline at end of file
+        publish_message_event(team_id, 'board_deleted', {})
+        return True
+
+    @staticmethod
+    def migrate_embedded_messages():
+        """Moves messages of boards still using the embedded layout into buckets, returns the number of boards moved."""
+        migrated = 0
+        for message_board in MessageBoard.objects(messages__0__exists=True):
+            messages = [message.to_mongo() for message in message_board.messages]
+            for message in messages:
+                message.setdefault('message_id', ObjectId())
+
+            # numbered before any bucket started since the deploy, so the old messages stay first
+            existing = MessageBucket.objects(team_id=message_board.team_id).order_by('bucket_number').first()
+            first_bucket_number = existing.bucket_number - (len(messages) - 1) // MESSAGES_PER_BUCKET - 1 if existing else 0
+
+            buckets = []
+            for offset in range(0, len(messages), MESSAGES_PER_BUCKET):
+                chunk = messages[offset:offset + MESSAGES_PER_BUCKET]
+                buckets.append({
+                    'team_id': message_board.team_id,
+                    'bucket_number': first_bucket_number + offset // MESSAGES_PER_BUCKET,
+                    # older buckets never take new appends
+                    'appended': MESSAGES_PER_BUCKET if existing or offset + MESSAGES_PER_BUCKET < len(messages) else len(chunk),
+                    'message_count': len(chunk),
+                    'created_at': chunk[0].get('created_at', datetime.utcnow()),
+                    'last_updated': message_board.last_updated or datetime.utcnow(),
+                    'messages': chunk
+                })
+            MessageBucket._get_collection().insert_many(buckets)
+            MessageBoard.objects(id=message_board.id).update_one(unset__messages=True)
+            migrated += 1
+
+        # messages bucketed before they had stable ids
+        collection = MessageBucket._get_collection()
+        for bucket in collection.find({'messages': {'$elemMatch': {'message_id': {'$exists': False}}}}, {'messages.message_id': 1}):
+            for index, message in enumerate(bucket['messages']):
+                if 'message_id' not in message:
+                    collection.update_one(
+                        {'_id': bucket['_id'], f'messages.{index}.message_id': {'$exists': False}},
+                        {'$set': {f'messages.{index}.message_id': ObjectId()}}
+                    )
+        return migrated
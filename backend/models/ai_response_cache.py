@@ -0,0 +1,29 @@
+import mongoengine as me
+import os
+from datetime import datetime
+
+# Load environment variables
+MONGODB_URI = os.getenv('MONGODB_URI')
+
+me.connect(host = MONGODB_URI)
+
+AI_CACHE_TTL_SECONDS = int(os.getenv('AI_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+
+
+# A model answer to a document analysis, keyed by a hash of everything the answer
+# depends on (see services.ai_cache.analysis_cache_key). Entries expire with the
+# TTL index, least recently used ones are evicted beyond AI_CACHE_MAX_ENTRIES.
+class AIResponseCache(me.Document):
+    meta = {
+        'collection': 'ai_response_cache',
+        'indexes': [
+            {'fields': ['key'], 'unique': True},
+            {'fields': ['last_used_at']},
+            {'fields': ['created_at'], 'expireAfterSeconds': AI_CACHE_TTL_SECONDS}
+        ]
+    }
+    key = me.StringField(required=True)
+    response = me.StringField(required=True)
+    hits = me.IntField(default=0)
+    created_at = me.DateTimeField(default=datetime.utcnow)
+    last_used_at = me.DateTimeField(default=datetime.utcnow)
@@ -1,9 +1,34 @@
 import mongoengine as me
+import os
 from datetime import datetime
 
+TEMP_TURN_TTL_SECONDS = int(os.getenv('AI_TEMP_TURN_TTL_SECONDS', 24 * 3600))
+
 class Conversation(me.Document):
     meta = {'collection': 'conversations'}
     email = me.StringField(required=True, unique=True)  # Use email as the identifier
     user_type = me.StringField(required=True, choices=['player', 'management'])
-    history = me.ListField(me.DictField(), default=[])
+    history = me.ListField(me.DictField(), default=[])  # legacy embedded turns, moved to ConversationTurn on first access
+    turn_count = me.IntField(default=0)  # sequence number of the next turn
+    summary = me.StringField()  # rolling summary of the turns before summary_upto, see services.ai_context
+    summary_upto = me.IntField(default=0)
     last_updated = me.DateTimeField(default=datetime.utcnow)
+
+# One message of a conversation, appended with an insert instead of rewriting the conversation.
+# Temporary turns get an expires_at and are removed by the TTL index if never cleaned explicitly.
+class ConversationTurn(me.Document):
+    meta = {
+        'collection': 'conversation_turns',
+        'indexes': [
+            {'fields': ['conversation_id', 'seq'], 'unique': True},
+            {'fields': ['conversation_id', 'role']},
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0}
+        ]
+    }
+    conversation_id = me.ObjectIdField(required=True)
+    seq = me.IntField(required=True)
+    role = me.StringField(required=True)
+    content = me.StringField()
+    is_temp = me.BooleanField(default=False)
+    created_at = me.DateTimeField(default=datetime.utcnow)
+    expires_at = me.DateTimeField()
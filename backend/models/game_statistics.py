@@ -66,13 +66,21 @@ class PlayerStats(me.EmbeddedDocument):
 
 # Define the main document schema
 class GameStatistics(me.Document):
+    meta = {
+        'indexes': [
+            {'fields': ['team_id', 'game_date']},  # team game listings, ordered by date
+            {'fields': ['team_id', 'opponent_key']}  # games against one opponent
+        ]
+    }
     team_id = me.StringField(required=True)
     opposite_team_name = me.StringField(required=True)
+    opponent_key = me.StringField()  # normalized opposite_team_name, see services.stats_opponents
     game_date = me.DateTimeField(required=True)
     team_sets_won_count = me.IntField(default=0)
     team_sets_lost_count = me.IntField(default=0)
     sets_scores = me.MapField(field=me.EmbeddedDocumentField(SetScore), default = {})
     team_stats = me.MapField(field=me.EmbeddedDocumentField(PlayerStats), default = {})
+    version = me.IntField(default=0)  # bumped on every update, used for optimistic concurrency
 
     def __str__(self):
         return f'GameStatistics(team_id={self.team_id}, opposite_team_name={self.opposite_team_name}, game_date={self.game_date})'
@@ -1,11 +1,16 @@
 import mongoengine as me
 import os
+from bson import ObjectId
 from datetime import datetime
 
 MONGODB_URI = os.getenv('MONGODB_URI')
 me.connect(host=MONGODB_URI)
 
+# Maximum number of messages appended to a single bucket
+MESSAGES_PER_BUCKET = 100
+
 class Message(me.EmbeddedDocument):
+    message_id = me.ObjectIdField(default=ObjectId)  # stable id, used by the update and delete routes
     content = me.StringField(required=True)
     type = me.StringField(required=True)
     creator_email = me.StringField(required=True)
@@ -20,4 +25,26 @@ class MessageBoard(me.Document):
     team_id = me.StringField(required=True, unique=True)
     created_at = me.DateTimeField(default=datetime.utcnow)
     last_updated = me.DateTimeField(default=datetime.utcnow)
-    messages = me.ListField(me.EmbeddedDocumentField(Message), default=[])
\ No newline at end of file
+    messages = me.ListField(me.EmbeddedDocumentField(Message), default=[])  # legacy embedded layout, see MessageBucket
+
+class MessageBucket(me.Document):
+    """A fixed-size chunk of a team's messages, so posting never rewrites the whole history.
+
+    Only the newest bucket of a team has appended < MESSAGES_PER_BUCKET, appends go there
+    and a new bucket is started once it is full. message_count drops on deletes, appended doesn't.
+    """
+    meta = {
+        'collection': 'message_buckets',
+        'indexes': [
+            {'fields': ['team_id', 'bucket_number'], 'unique': True},
+            {'fields': ['team_id', 'appended']},
+            {'fields': ['team_id', 'messages.message_id']}
+        ]
+    }
+    team_id = me.StringField(required=True)
+    bucket_number = me.IntField(required=True)
+    appended = me.IntField(default=0)
+    message_count = me.IntField(default=0)
+    created_at = me.DateTimeField(default=datetime.utcnow)
+    last_updated = me.DateTimeField(default=datetime.utcnow)
+    messages = me.ListField(me.EmbeddedDocumentField(Message), default=[])
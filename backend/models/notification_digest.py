@@ -0,0 +1,36 @@
+import mongoengine as me
+import os
+from datetime import datetime
+
+# Load environment variables
+MONGODB_URI = os.getenv('MONGODB_URI')
+
+me.connect(host = MONGODB_URI)
+
+
+class DigestItem(me.EmbeddedDocument):
+    title = me.StringField(required=True)
+    body = me.StringField(required=True)
+    data = me.DictField(default=dict)
+    created_at = me.DateTimeField(default=datetime.utcnow)
+
+
+# Notifications waiting to be sent to one push token as a single combined push.
+# The sender claims due digests by setting claim_id, notifications arriving after
+# that start a fresh digest (claim_id None) for the same token.
+class NotificationDigest(me.Document):
+    meta = {
+        'collection': 'notification_digests',
+        'indexes': [
+            {'fields': ['token', 'claim_id'], 'unique': True},
+            {'fields': ['send_after']}
+        ]
+    }
+    token = me.StringField(required=True)
+    email = me.StringField()
+    items = me.EmbeddedDocumentListField(DigestItem, default=list)  # the latest MAX_DIGEST_ITEMS only
+    count = me.IntField(default=0)
+    send_after = me.DateTimeField(required=True)
+    claim_id = me.ObjectIdField(default=None)
+    claimed_at = me.DateTimeField()
+    created_at = me.DateTimeField(default=datetime.utcnow)
@@ -0,0 +1,42 @@
+import mongoengine as me
+import os
+from datetime import datetime
+
+# Load environment variables
+MONGODB_URI = os.getenv('MONGODB_URI')
+
+me.connect(host = MONGODB_URI)
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed')
+FINISHED_JOB_TTL_SECONDS = int(os.getenv('NOTIFICATION_JOB_TTL_SECONDS', 7 * 24 * 3600))
+
+
+# A push notification fan-out waiting for, or processed by, a background worker.
+# Workers claim a job by moving it to running with a lease (locked_until), so a job
+# whose worker died is picked up again once the lease expires.
+class NotificationJob(me.Document):
+    meta = {
+        'collection': 'notification_jobs',
+        'indexes': [
+            {'fields': ['status', 'available_at']},
+            {'fields': ['finished_at'], 'expireAfterSeconds': FINISHED_JOB_TTL_SECONDS}
+        ]
+    }
+    team_name = me.StringField(required=True)
+    team_id = me.StringField(required=True)
+    title = me.StringField(required=True)
+    body = me.StringField(required=True)
+    data = me.DictField(default=dict)
+    status = me.StringField(choices=JOB_STATUSES, default='queued')
+    attempts = me.IntField(default=0)
+    available_at = me.DateTimeField(default=datetime.utcnow)  # pushed back when a failed attempt is retried
+    locked_until = me.DateTimeField()
+    total = me.IntField(default=0)
+    sent = me.IntField(default=0)
+    failed = me.IntField(default=0)
+    cursor = me.StringField()  # last token sent, recipients are sent in token order
+    tickets = me.ListField(me.DictField(), default=list)  # the latest failed tickets only
+    error = me.StringField()
+    created_at = me.DateTimeField(default=datetime.utcnow)
+    started_at = me.DateTimeField()
+    finished_at = me.DateTimeField()
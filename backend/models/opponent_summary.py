@@ -0,0 +1,30 @@
+import mongoengine as me
+import os
+from datetime import datetime
+
+# Load environment variables
+MONGODB_URI = os.getenv('MONGODB_URI')
+
+me.connect(host = MONGODB_URI)
+
+
+# Head-to-head record of a team against one opponent, kept up to date on every
+# GameStatistics write. opponent_key is the normalized opponent name.
+class OpponentSummary(me.Document):
+    meta = {
+        'collection': 'opponent_summaries',
+        'indexes': [
+            {'fields': ['team_id', 'opponent_key'], 'unique': True}
+        ]
+    }
+    team_id = me.StringField(required=True)
+    opponent_key = me.StringField(required=True)
+    opponent_name = me.StringField()  # latest spelling used for this opponent
+    games_played = me.IntField(default=0)
+    wins = me.IntField(default=0)
+    losses = me.IntField(default=0)
+    sets_won = me.IntField(default=0)
+    sets_lost = me.IntField(default=0)
+    points_won = me.IntField(default=0)
+    points_lost = me.IntField(default=0)
+    last_updated = me.DateTimeField(default=datetime.utcnow)
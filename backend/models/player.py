@@ -6,7 +6,12 @@ MONGODB_URI = os.getenv('MONGODB_URI')
 me.connect(host=MONGODB_URI)
 
 class Player(me.Document):
-    meta = {'collection': 'players'}
+    meta = {
+        'collection': 'players',
+        'indexes': [
+            {'fields': ['team_id', 'push_token']}  # notification recipients of a team
+        ]
+    }
     email = me.StringField(required=True, unique=True)
     full_name = me.StringField(required=True)
     password = me.StringField(required=True)
@@ -0,0 +1,32 @@
+import mongoengine as me
+import os
+from datetime import datetime
+from models.game_statistics import AttackStats, ServeStats, ServeReceivesStats, DigsStats, SettingStats, BlocksStats
+
+# Load environment variables
+MONGODB_URI = os.getenv('MONGODB_URI')
+
+me.connect(host = MONGODB_URI)
+
+
+# Running season totals of one player, kept up to date by applying deltas on every
+# GameStatistics write. Only the counters are maintained, derived percentages are
+# computed when the rollup is read.
+class PlayerSeasonRollup(me.Document):
+    meta = {
+        'collection': 'player_season_rollups',
+        'indexes': [
+            {'fields': ['team_id', 'season', 'player_id'], 'unique': True}
+        ]
+    }
+    team_id = me.StringField(required=True)
+    season = me.StringField(required=True)
+    player_id = me.StringField(required=True)
+    games_played = me.IntField(default=0)
+    attack = me.EmbeddedDocumentField(AttackStats, default=AttackStats)
+    serve = me.EmbeddedDocumentField(ServeStats, default=ServeStats)
+    serve_recieves = me.EmbeddedDocumentField(ServeReceivesStats, default=ServeReceivesStats)
+    digs = me.EmbeddedDocumentField(DigsStats, default=DigsStats)
+    setting = me.EmbeddedDocumentField(SettingStats, default=SettingStats)
+    blocks = me.EmbeddedDocumentField(BlocksStats, default=BlocksStats)
+    last_updated = me.DateTimeField(default=datetime.utcnow)
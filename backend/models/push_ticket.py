@@ -0,0 +1,32 @@
+import mongoengine as me
+import os
+from datetime import datetime
+
+# Load environment variables
+MONGODB_URI = os.getenv('MONGODB_URI')
+
+me.connect(host = MONGODB_URI)
+
+# Expo keeps receipts for about a day, tickets are useless after that
+TICKET_TTL_SECONDS = 2 * 24 * 3600
+
+
+# An Expo push ticket waiting for its delivery receipt. Receipts reporting
+# DeviceNotRegistered clear the token from the player or manager holding it.
+class PushTicket(me.Document):
+    meta = {
+        'collection': 'push_tickets',
+        'indexes': [
+            {'fields': ['ticket_id'], 'unique': True},
+            {'fields': ['status', 'created_at']},
+            {'fields': ['created_at'], 'expireAfterSeconds': TICKET_TTL_SECONDS}
+        ]
+    }
+    ticket_id = me.StringField(required=True)
+    token = me.StringField(required=True)
+    job_id = me.ObjectIdField()
+    status = me.StringField(choices=('pending', 'ok', 'error'), default='pending')
+    error = me.StringField()
+    message = me.StringField()
+    created_at = me.DateTimeField(default=datetime.utcnow)
+    checked_at = me.DateTimeField()
@@ -1,5 +1,5 @@
 from flask import Blueprint
-from controllers.ai_advior import message_ai_advisor, customize_ai_advisor, load_conv_history, clean_temp_messages
+from controllers.ai_advior import message_ai_advisor, stream_ai_advisor, customize_ai_advisor, load_conv_history, clean_temp_messages, get_ai_cache_stats
 
 ai_advior_bp = Blueprint('ai_advior', __name__)
 
@@ -12,6 +12,10 @@ def load_conv_history_route():
 def message_ai_advisor_route():
     return message_ai_advisor()
 
+@ai_advior_bp.route("/message_ai_advisor/stream", methods=['POST'])
+def stream_ai_advisor_route():
+    return stream_ai_advisor()
+
 
 @ai_advior_bp.route("/customize_ai_advisor", methods=['POST'])
 def customize_ai_advisor_route():
@@ -20,3 +24,7 @@ def customize_ai_advisor_route():
 @ai_advior_bp.route("/clean_temp_messages", methods=['POST'])
 def clean_temp_messages_route():
     return clean_temp_messages()
+
+@ai_advior_bp.route("/cache_stats", methods=['GET'])
+def ai_cache_stats_route():
+    return get_ai_cache_stats()
\ No newline at end of file
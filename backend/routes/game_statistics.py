@@ -1,5 +1,5 @@
 from flask import Blueprint, request
-from controllers.game_statistics import create_game_statistics, get_game_statistics_by_id, get_game_statistics_by_team_id, delete_game_statistics_by_id, update_game_statistics
+from controllers.game_statistics import create_game_statistics, get_game_statistics_by_id, get_game_statistics_by_team_id, delete_game_statistics_by_id, update_game_statistics, get_team_season_aggregate, get_team_player_rollups, record_stat_events, get_team_analytics, get_team_opponents, get_team_opponent_history, import_game_statistics, export_team_game_statistics
 
 game_statistics_bp = Blueprint('game_statistics', __name__)
 
@@ -13,7 +13,31 @@ def get_game_statistics_by_id_route(game_id):
 
 @game_statistics_bp.route('/team_id/<team_id>', methods=['GET'])
 def get_game_statistics_by_team_id_route(team_id):
-    return get_game_statistics_by_team_id(team_id)
+    return get_game_statistics_by_team_id(team_id, request.args)
+
+@game_statistics_bp.route('/team_id/<team_id>/aggregate', methods=['GET'])
+def get_team_season_aggregate_route(team_id):
+    return get_team_season_aggregate(team_id, request.args)
+
+@game_statistics_bp.route('/team_id/<team_id>/rollups', methods=['GET'])
+def get_team_player_rollups_route(team_id):
+    return get_team_player_rollups(team_id, request.args)
+
+@game_statistics_bp.route('/team_id/<team_id>/analytics/<analysis>', methods=['GET'])
+def get_team_analytics_route(team_id, analysis):
+    return get_team_analytics(team_id, analysis, request.args)
+
+@game_statistics_bp.route('/team_id/<team_id>/opponents', methods=['GET'])
+def get_team_opponents_route(team_id):
+    return get_team_opponents(team_id)
+
+@game_statistics_bp.route('/team_id/<team_id>/opponents/<opponent_name>', methods=['GET'])
+def get_team_opponent_history_route(team_id, opponent_name):
+    return get_team_opponent_history(team_id, opponent_name)
+
+@game_statistics_bp.route('/team_id/<team_id>/export', methods=['GET'])
+def export_team_game_statistics_route(team_id):
+    return export_team_game_statistics(team_id, request.args)
 
 @game_statistics_bp.route('/game_id/<game_id>', methods=['DELETE'])
 def delete_game_statistics_route(game_id):
@@ -22,3 +46,11 @@ def delete_game_statistics_route(game_id):
 @game_statistics_bp.route('/update', methods=['PUT'])
 def update_game_statistics_route():
     return update_game_statistics(request)
+
+@game_statistics_bp.route('/events', methods=['POST'])
+def record_stat_events_route():
+    return record_stat_events(request)
+
+@game_statistics_bp.route('/import', methods=['POST'])
+def import_game_statistics_route():
+    return import_game_statistics(request)
\ No newline at end of file
@@ -1,8 +1,31 @@
-from flask import Blueprint, request, jsonify
-from controllers.message_board_controller import MessageBoardController
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from controllers.message_board_controller import MessageBoardController, MAX_MESSAGES_PAGE
+from services.message_events import message_json, stream_message_events
 
 message_board_bp = Blueprint('message_board', __name__)
 
+# Messages are stamped before their write commits, so a message stamped just before a read
+# may only become visible after it. The sync cursor is moved back by this much; clients merge
+# the re-sent messages by id.
+SYNC_OVERLAP_SECONDS = 5
+
+def resolve_message_id(team_id, message_ref):
+    """Messages are addressed by id; a plain number is still read as the old board-wide index."""
+    if ObjectId.is_valid(message_ref):
+        return message_ref
+    if message_ref.isdigit():
+        return MessageBoardController.message_id_at(team_id, int(message_ref))
+    raise ValueError('Message not found')
+
+def parse_since(value):
+    """ISO timestamp as sent back by clients, stored times are naive UTC."""
+    since = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
 # Create a message board for a team
 @message_board_bp.route('/', methods=['POST'])
 def create_message_board():
@@ -25,29 +48,57 @@ def create_message_board():
         return jsonify({'error': str(e)}), 500
 
 # Get message board for a team
+# ?limit=&before=<message id> pages back from the newest messages, ?since=<ISO time> returns only what changed
 @message_board_bp.route('/<team_id>', methods=['GET'])
 def get_message_board(team_id):
     try:
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or not 0 < int(limit) <= MAX_MESSAGES_PAGE:
+                raise ValueError(f'limit must be between 1 and {MAX_MESSAGES_PAGE}')
+            limit = int(limit)
+        before = request.args.get('before')
+        since = request.args.get('since')
+        since = parse_since(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        synced_at = datetime.utcnow() - timedelta(seconds=SYNC_OVERLAP_SECONDS)
         message_board = MessageBoardController.get_message_board(team_id)
-        return jsonify({
+        messages, previous_before = MessageBoardController.get_messages(team_id, limit, before, since)
+        response = {
             'message_board_id': str(message_board.id),
             'team_id': str(message_board.team_id),
-            'messages': [
-                {
-                    'content': msg.content,
-                    'type': msg.type,
-                    'creator_email': msg.creator_email,
-                    'created_at': msg.created_at.isoformat(),
-                    'last_updated': msg.last_updated.isoformat()
-                } for msg in message_board.messages
-            ]
-        }), 200
+            'messages': [message_json(message) for message in messages],
+            # pass back as `since` on the next poll
+            'synced_at': synced_at.isoformat()
+        }
+        if limit:
+            response['before'] = previous_before
+        return jsonify(response), 200
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Stream new, edited and deleted messages as Server-Sent Events
+# Reconnecting clients send Last-Event-ID (or ?last_event_id=) to receive what they missed
+@message_board_bp.route('/<team_id>/events', methods=['GET'])
+def stream_message_board_events(team_id):
+    try:
+        MessageBoardController.get_message_board(team_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        stream_with_context(stream_message_events(team_id, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # Add a message to the board
 @message_board_bp.route('/<team_id>/messages', methods=['POST'])
 def add_message(team_id):
@@ -57,13 +108,14 @@ def add_message(team_id):
         message_type = data.get('type')
         creator_email = data.get('creator_email')
         
-        message_board = MessageBoardController.add_message(
+        message_board, new_message = MessageBoardController.add_message(
             team_id, content, message_type, creator_email
         )
         
         return jsonify({
             'message': 'Message added successfully',
-            'message_board_id': str(message_board.id)
+            'message_board_id': str(message_board.id),
+            'message_id': str(new_message.message_id)
         }), 201
         
     except ValueError as e:
@@ -72,15 +124,15 @@ def add_message(team_id):
         return jsonify({'error': str(e)}), 500
 
 # Update a message
-@message_board_bp.route('/<team_id>/messages/<int:message_index>', methods=['PUT'])
-def update_message(team_id, message_index):
+@message_board_bp.route('/<team_id>/messages/<message_ref>', methods=['PUT'])
+def update_message(team_id, message_ref):
     try:
         data = request.get_json()
         content = data.get('content')
         message_type = data.get('type')
         
         message_board = MessageBoardController.update_message(
-            team_id, message_index, content, message_type
+            team_id, resolve_message_id(team_id, message_ref), content, message_type
         )
         
         return jsonify({'message': 'Message updated successfully'}), 200
@@ -91,10 +143,10 @@ def update_message(team_id, message_index):
         return jsonify({'error': str(e)}), 500
 
 # Delete a message
-@message_board_bp.route('/<team_id>/messages/<int:message_index>', methods=['DELETE'])
-def delete_message(team_id, message_index):
+@message_board_bp.route('/<team_id>/messages/<message_ref>', methods=['DELETE'])
+def delete_message(team_id, message_ref):
     try:
-        MessageBoardController.delete_message(team_id, message_index)
+        MessageBoardController.delete_message(team_id, resolve_message_id(team_id, message_ref))
         return jsonify({'message': 'Message deleted successfully'}), 200
         
     except ValueError as e:
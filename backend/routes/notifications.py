@@ -1,5 +1,5 @@
 from flask import Blueprint, request
-from controllers.notifications import send_notifications, register_notifications
+from controllers.notifications import send_notifications, register_notifications, get_notification_job
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -9,4 +9,8 @@ def send_notification():
 
 @notifications_bp.route('/register', methods=['POST'])
 def register_notification():
-    return register_notifications(request)
\ No newline at end of file
+    return register_notifications(request)
+
+@notifications_bp.route('/jobs/<job_id>', methods=['GET'])
+def notification_job(job_id):
+    return get_notification_job(job_id, request)
\ No newline at end of file
@@ -2,6 +2,9 @@ import openai
 import os
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
+# Overridable so a local fake completion server can stand in during development
+if os.getenv("OPENAI_API_BASE"):
+    openai.api_base = os.getenv("OPENAI_API_BASE")
 
 def get_response(messages, question):
     # Add the user's question to the conversation
@@ -21,3 +24,44 @@ def get_response(messages, question):
     assistant_message = response["choices"][0]["message"]["content"]
 
     return assistant_message
+
+def stream_response(messages, question):
+    # Same completion as get_response, yielding the answer piece by piece as it is generated
+    temp_messages = messages + [{"role": "user", "content": question}]
+
+    response = openai.ChatCompletion.create(
+        model=os.getenv("OPENAI_ENGINE"),
+        messages=temp_messages,
+        temperature=0.7,
+        max_tokens=2000,
+        top_p=1,
+        frequency_penalty=0,
+        presence_penalty=0,
+        stream=True
+    )
+
+    for chunk in response:
+        delta = chunk["choices"][0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+
+SUMMARY_MAX_TOKENS = int(os.getenv("AI_SUMMARY_MAX_TOKENS", 400))
+
+def summarize_conversation(previous_summary, messages):
+    # Fold older turns into the running summary of the conversation
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    prompt = (
+        "Update the summary of this coaching conversation with the new turns below. "
+        "Keep the facts, numbers, decisions and open questions, in at most a few short paragraphs.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+
+    response = openai.ChatCompletion.create(
+        model=os.getenv("OPENAI_ENGINE"),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.2,
+        max_tokens=SUMMARY_MAX_TOKENS
+    )
+
+    return response["choices"][0]["message"]["content"]
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from models.ai_response_cache import AIResponseCache, AI_CACHE_TTL_SECONDS
+
+AI_CACHE_BACKEND = os.getenv('AI_CACHE_BACKEND', 'memory')  # 'memory' or 'mongo'
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 1000))
+# Bump whenever the way a document is turned into the prompt changes, so old answers stop matching
+PROMPT_TEMPLATE_VERSION = 'document-v2'  # v2: games are sent as compact tables
+
+
+def analysis_cache_key(system_messages, document_type, document_id, document):
+    """Content address of a document analysis.
+
+    The answer depends on the system role and customizations, the model, the prompt
+    template and the document's content, so an edited document (or a changed role) misses.
+    """
+    parts = {
+        'system': [message.get('content') for message in system_messages],
+        'model': os.getenv('OPENAI_ENGINE'),
+        'template': PROMPT_TEMPLATE_VERSION,
+        'document_type': document_type,
+        'document_id': document_id,
+        'document_hash': hashlib.sha256(document.encode('utf-8')).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class MemoryResponseCache:
+    """Per-process LRU cache whose entries also expire after ttl_seconds."""
+
+    def __init__(self, max_entries=AI_CACHE_MAX_ENTRIES, ttl_seconds=AI_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self):
+        return len(self._entries)
+
+
+class MongoResponseCache:
+    """Cache shared by every process, expired by the collection's TTL index."""
+
+    def __init__(self, max_entries=AI_CACHE_MAX_ENTRIES, ttl_seconds=AI_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+
+    def get(self, key):
+        now = datetime.utcnow()
+        # the TTL monitor only runs every minute, so expiry is also checked here
+        entry = AIResponseCache._get_collection().find_one_and_update(
+            {'key': key, 'created_at': {'$gt': now - timedelta(seconds=self.ttl_seconds)}},
+            {'$set': {'last_used_at': now}, '$inc': {'hits': 1}},
+            projection={'response': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return entry['response'] if entry else None
+
+    def set(self, key, response):
+        collection = AIResponseCache._get_collection()
+        now = datetime.utcnow()
+        collection.update_one(
+            {'key': key},
+            {'$set': {'response': response, 'created_at': now, 'last_used_at': now}, '$setOnInsert': {'hits': 0}},
+            upsert=True
+        )
+        surplus = collection.estimated_document_count() - self.max_entries
+        if surplus > 0:
+            # least recently used first
+            stale = [entry['_id'] for entry in collection.find({}, {'_id': 1}).sort('last_used_at', 1).limit(surplus)]
+            self.evictions += collection.delete_many({'_id': {'$in': stale}}).deleted_count
+
+    def size(self):
+        return AIResponseCache._get_collection().estimated_document_count()
+
+
+class ResponseCache:
+    """Counts hits and misses around the configured backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        try:
+            response = self.backend.get(key)
+        except Exception as e:
+            print(f"Error reading AI response cache: {str(e)}")
+            response = None
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def set(self, key, response):
+        try:
+            self.backend.set(key, response)
+        except Exception as e:
+            print(f"Error writing AI response cache: {str(e)}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': AI_CACHE_BACKEND,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'size': self.backend.size(),
+            'max_entries': self.backend.max_entries,
+        }
+
+
+ai_response_cache = ResponseCache(MongoResponseCache() if AI_CACHE_BACKEND == 'mongo' else MemoryResponseCache())
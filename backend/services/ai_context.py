@@ -0,0 +1,93 @@
+import os
+from services.ai_advior import summarize_conversation
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a character based estimate
+    tiktoken = None
+
+# Prompt tokens sent per turn: pinned system messages, the summary, recent turns and the question
+CONTEXT_TOKEN_BUDGET = int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', 6000))
+# Once the unsummarized turns outgrow the budget, they are folded into the summary down to this share of it,
+# so the summary is only rewritten every few turns
+SUMMARY_KEEP_RATIO = 0.5
+# Share of the budget always left to recent turns, so an oversized document (which is sent
+# over budget anyway) doesn't fold every turn and rewrite the summary on each message
+MIN_TURN_BUDGET_RATIO = 0.25
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators of every chat message
+SUMMARY_PREFIX = 'Summary of the earlier conversation: '
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model(os.getenv('OPENAI_ENGINE') or 'gpt-3.5-turbo')
+        except Exception:
+            try:
+                _encoding = tiktoken.get_encoding('cl100k_base')
+            except Exception as e:  # the encoding files couldn't be loaded
+                print(f"Token encoding unavailable, estimating: {e}")
+                _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text or ''))
+    return len(text or '') // 4 + 1
+
+
+def message_tokens(message):
+    return count_tokens(message.get('content')) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _chat_message(message):
+    # only what the API accepts, history entries carry flags such as isTemp
+    return {'role': message['role'], 'content': message.get('content') or ''}
+
+
+def build_context(conversation, history, question, budget=CONTEXT_TOKEN_BUDGET):
+    """Messages to send ahead of `question`, kept within `budget` tokens.
+
+    history holds the conversation's turns (dicts with seq, role and content) in order.
+    System messages (the advisor role and customizations) are always sent. Turns before
+    conversation.summary_upto are only represented by conversation.summary; when the turns
+    after it outgrow the budget, the oldest are folded into the summary, which updates
+    summary and summary_upto on the conversation (saved by the caller).
+    """
+    pinned = [_chat_message(message) for message in history if message.get('role') == 'system']
+    turns = [(message['seq'], message) for message in history
+             if message.get('role') != 'system' and message['seq'] >= (conversation.summary_upto or 0)]
+
+    fixed_tokens = sum(message_tokens(message) for message in pinned) + count_tokens(question) + MESSAGE_OVERHEAD_TOKENS
+    turn_budget = max(budget - fixed_tokens - count_tokens(conversation.summary) - MESSAGE_OVERHEAD_TOKENS,
+                      int(budget * MIN_TURN_BUDGET_RATIO))
+
+    turn_tokens = [message_tokens(message) for _, message in turns]
+    if sum(turn_tokens) > turn_budget:
+        # fold the oldest turns into the summary until the rest fits in part of the budget
+        keep_tokens, first_kept = 0, len(turns)
+        while first_kept > 0 and keep_tokens + turn_tokens[first_kept - 1] <= turn_budget * SUMMARY_KEEP_RATIO:
+            first_kept -= 1
+            keep_tokens += turn_tokens[first_kept]
+        # start on a question rather than in the middle of an exchange
+        while first_kept < len(turns) and turns[first_kept][1].get('role') != 'user':
+            first_kept += 1
+        folded = [_chat_message(message) for _, message in turns[:first_kept]]
+        try:
+            conversation.summary = summarize_conversation(conversation.summary, folded)
+            conversation.summary_upto = turns[first_kept][0] if first_kept < len(turns) else turns[-1][0] + 1
+        except Exception as e:
+            # keep the old summary, the folded turns are only left out of this request
+            print(f"Error summarizing conversation: {str(e)}")
+        turns, turn_tokens = turns[first_kept:], turn_tokens[first_kept:]
+
+    context = list(pinned)
+    if conversation.summary:
+        context.append({'role': 'system', 'content': SUMMARY_PREFIX + conversation.summary})
+    context.extend(_chat_message(message) for _, message in turns)
+    return context
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from models.conversation import Conversation, ConversationTurn, TEMP_TURN_TTL_SECONDS
+
+MAX_HISTORY_PAGE = 200
+
+
+def turn_json(turn):
+    """A stored turn in the shape of the legacy history entries."""
+    message = {'role': turn['role'], 'content': turn.get('content')}
+    if turn.get('is_temp'):
+        message['isTemp'] = True
+    return message
+
+
+def _turn_documents(conversation_id, first_seq, messages):
+    now = datetime.utcnow()
+    documents = []
+    for offset, message in enumerate(messages):
+        is_temp = bool(message.get('isTemp'))
+        documents.append({
+            'conversation_id': conversation_id,
+            'seq': first_seq + offset,
+            'role': message['role'],
+            'content': message.get('content'),
+            'is_temp': is_temp,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=TEMP_TURN_TTL_SECONDS) if is_temp else None
+        })
+    return documents
+
+
+def migrate_conversation(conversation):
+    """Moves a conversation's legacy embedded history into turns, keeping the positions as sequence numbers."""
+    if not conversation.history:
+        return conversation
+    documents = _turn_documents(conversation.id, 0, conversation.history)
+    try:
+        ConversationTurn._get_collection().insert_many(documents, ordered=False)
+    except BulkWriteError:
+        # turns already inserted by an interrupted or concurrent migration
+        pass
+    # summary_upto already counts history positions, which are now the sequence numbers
+    Conversation.objects(id=conversation.id).update_one(set__turn_count=len(documents), unset__history=True)
+    conversation.reload()
+    return conversation
+
+
+def get_conversation(email, user_type, create_with=None):
+    """The user's conversation without its legacy history, created with the `create_with` turns when missing."""
+    conversation = Conversation.objects(email=email, user_type=user_type).first()
+    if conversation and conversation.history:
+        conversation = migrate_conversation(conversation)
+    if not conversation and create_with is not None:
+        conversation = Conversation(email=email, user_type=user_type)
+        conversation.save()
+        append_turns(conversation, create_with)
+    return conversation
+
+
+def append_turns(conversation, messages):
+    """Appends messages atomically: the sequence numbers are reserved with one $inc, the turns inserted in one batch."""
+    if not messages:
+        return
+    updated = Conversation._get_collection().find_one_and_update(
+        {'_id': conversation.id},
+        {'$inc': {'turn_count': len(messages)}, '$set': {'last_updated': datetime.utcnow()}},
+        projection={'turn_count': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    first_seq = updated['turn_count'] - len(messages)
+    ConversationTurn._get_collection().insert_many(_turn_documents(conversation.id, first_seq, messages))
+    conversation.turn_count = updated['turn_count']
+
+
+def system_turns(conversation):
+    return list(ConversationTurn.objects(conversation_id=conversation.id, role='system').order_by('seq').as_pymongo())
+
+
+def context_turns(conversation):
+    """System turns and every turn not folded into the summary yet, in order."""
+    return list(ConversationTurn.objects(__raw__={
+        'conversation_id': conversation.id,
+        '$or': [{'role': 'system'}, {'seq': {'$gte': conversation.summary_upto or 0}}]
+    }).order_by('seq').as_pymongo())
+
+
+def save_summary(conversation):
+    Conversation.objects(id=conversation.id).update_one(
+        set__summary=conversation.summary, set__summary_upto=conversation.summary_upto
+    )
+
+
+def load_turns(conversation, limit=None, before=None):
+    """Turns oldest first, and the `before` sequence number of the previous page (None when there is none).
+
+    With a limit, the newest `limit` turns before the `before` sequence number are returned.
+    """
+    turns = ConversationTurn.objects(conversation_id=conversation.id)
+    if before is not None:
+        turns = turns.filter(seq__lt=before)
+    if not limit:
+        return list(turns.order_by('seq').as_pymongo()), None
+
+    # one extra turn tells whether there is an older page
+    page = list(turns.order_by('-seq').limit(limit + 1).as_pymongo())
+    previous_before = page[limit - 1]['seq'] if len(page) > limit else None
+    return page[:limit][::-1], previous_before
+
+
+def delete_temp_turns(conversation):
+    ConversationTurn._get_collection().delete_many({'conversation_id': conversation.id, 'is_temp': True})
+
+
+def migrate_conversations():
+    """Migrates every conversation still holding an embedded history, returns how many were moved."""
+    migrated = 0
+    for conversation in Conversation.objects(history__0__exists=True):
+        migrate_conversation(conversation)
+        migrated += 1
+    return migrated
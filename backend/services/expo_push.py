@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# Overridable so a local fake Expo server can stand in during development
+EXPO_PUSH_URL = os.getenv('EXPO_PUSH_URL', 'https://exp.host/--/api/v2/push/send')
+EXPO_ACCESS_TOKEN = os.getenv('EXPO_ACCESS_TOKEN')
+EXPO_BATCH_SIZE = 100  # Expo accepts at most 100 messages per request
+EXPO_PUSH_CONCURRENCY = int(os.getenv('EXPO_PUSH_CONCURRENCY', 4))
+EXPO_TIMEOUT_SECONDS = int(os.getenv('EXPO_TIMEOUT_SECONDS', 10))
+EXPO_RECEIPTS_URL = os.getenv('EXPO_RECEIPTS_URL', 'https://exp.host/--/api/v2/push/getReceipts')
+EXPO_RECEIPTS_BATCH_SIZE = 1000  # Expo accepts at most 1000 receipt ids per request
+EXPO_MAX_RETRIES = int(os.getenv('EXPO_MAX_RETRIES', 3))
+EXPO_RETRY_BASE_SECONDS = float(os.getenv('EXPO_RETRY_BASE_SECONDS', 1))  # doubled on every further retry
+
+# Ticket errors worth sending the message again for
+TRANSIENT_TICKET_ERRORS = {'MessageRateExceeded'}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide session, so every batch reuses the pooled keep-alive connections to Expo."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_maxsize=max(EXPO_PUSH_CONCURRENCY, 1)))
+            session.mount('http://', HTTPAdapter(pool_maxsize=max(EXPO_PUSH_CONCURRENCY, 1)))
+            session.headers.update({
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
+                'Content-Type': 'application/json',
+            })
+            if EXPO_ACCESS_TOKEN:
+                session.headers['Authorization'] = f'Bearer {EXPO_ACCESS_TOKEN}'
+            _session = session
+        return _session
+
+
+def chunk_messages(messages, size=EXPO_BATCH_SIZE):
+    return [messages[offset:offset + size] for offset in range(0, len(messages), size)]
+
+
+def _error_results(batch, error):
+    return [{'to': message['to'], 'status': 'error', 'message': error} for message in batch]
+
+
+def _post_batch(session, batch):
+    """Posts one batch, returning one result per message and whether the whole request may be retried."""
+    try:
+        response = session.post(EXPO_PUSH_URL, json=batch, timeout=EXPO_TIMEOUT_SECONDS)
+    except requests.RequestException as e:
+        return _error_results(batch, str(e)), True
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    tickets = body.get('data')
+    if response.status_code != 200 or not isinstance(tickets, list) or len(tickets) != len(batch):
+        errors = body.get('errors') or [{'message': f'HTTP {response.status_code}'}]
+        transient = response.status_code == 429 or response.status_code >= 500
+        return _error_results(batch, '; '.join(error.get('message', '') for error in errors)), transient
+
+    # Expo answers with one ticket per message, in the order they were sent
+    return [{'to': message['to'], **ticket} for message, ticket in zip(batch, tickets)], False
+
+
+def _send_batch(session, batch):
+    """Sends one batch, retrying failed requests and rate-limited messages with exponential backoff."""
+    results = [None] * len(batch)
+    pending = list(range(len(batch)))
+    for attempt in range(EXPO_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(EXPO_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+        tickets, transient = _post_batch(session, [batch[index] for index in pending])
+
+        retry = []
+        for index, ticket in zip(pending, tickets):
+            results[index] = ticket
+            if transient or (ticket.get('details') or {}).get('error') in TRANSIENT_TICKET_ERRORS:
+                retry.append(index)
+        pending = retry
+        if not pending:
+            break
+    return results
+
+
+def get_push_receipts(ticket_ids, session=None):
+    """Receipts of the given ticket ids as {ticket_id: receipt}, ids without a receipt yet are left out."""
+    session = session or get_session()
+    receipts = {}
+    for offset in range(0, len(ticket_ids), EXPO_RECEIPTS_BATCH_SIZE):
+        response = session.post(
+            EXPO_RECEIPTS_URL, json={'ids': ticket_ids[offset:offset + EXPO_RECEIPTS_BATCH_SIZE]}, timeout=EXPO_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        receipts.update(response.json().get('data') or {})
+    return receipts
+
+
+def send_push_messages(messages, concurrency=EXPO_PUSH_CONCURRENCY, session=None):
+    """Sends Expo push messages in batches of EXPO_BATCH_SIZE and returns one result per message.
+
+    Each result is the recipient's Expo ticket with its token under 'to', e.g.
+    {'to': token, 'status': 'ok', 'id': ticket_id} or {'to': token, 'status': 'error', 'message': ...}.
+    Batches are sent over up to `concurrency` connections at once.
+    """
+    if not messages:
+        return []
+
+    session = session or get_session()
+    batches = chunk_messages(messages)
+    if concurrency <= 1 or len(batches) == 1:
+        batch_results = [_send_batch(session, batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+            batch_results = list(executor.map(lambda batch: _send_batch(session, batch), batches))
+    return [result for results in batch_results for result in results]
@@ -0,0 +1,211 @@
+import json
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+
+# Events kept per team so a reconnecting client can resume from its Last-Event-ID
+EVENT_HISTORY_SIZE = int(os.getenv('MESSAGE_EVENTS_HISTORY', 200))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv('MESSAGE_EVENTS_QUEUE_SIZE', 500))
+HEARTBEAT_SECONDS = int(os.getenv('MESSAGE_EVENTS_HEARTBEAT_SECONDS', 15))
+# Set to share events between processes through Redis streams (needs the redis package)
+MESSAGE_EVENTS_REDIS_URL = os.getenv('MESSAGE_EVENTS_REDIS_URL')
+
+# Sent instead of a backlog when the client can't be resumed, clients then re-fetch the board
+RESET_EVENT = 'reset'
+
+
+def message_json(message):
+    """JSON form of a raw (pymongo) message, as returned by the message board routes."""
+    return {
+        'id': str(message['message_id']),
+        'content': message['content'],
+        'type': message['type'],
+        'creator_email': message['creator_email'],
+        'created_at': message['created_at'].isoformat(),
+        'last_updated': message['last_updated'].isoformat()
+    }
+
+
+def format_sse(event_id, event_type, data):
+    lines = [f'event: {event_type}', f'data: {json.dumps(data)}']
+    if event_id:
+        lines.insert(0, f'id: {event_id}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class InProcessSubscription:
+    def __init__(self, hub, team_id, backlog):
+        self._hub = hub
+        self.team_id = team_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False
+        self._backlog = deque(backlog)
+
+    def get(self, timeout):
+        """Next (event id, type, data), or None when nothing was published within timeout."""
+        if self._backlog:
+            return self._backlog.popleft()
+        if self.lagged:
+            # fell too far behind, drop what's queued and let the client re-fetch
+            self.lagged = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return (self._hub.latest_event_id(self.team_id), RESET_EVENT, {})
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+
+class InProcessMessageHub:
+    """Fans out message board events to the subscribers of a team within this process.
+
+    Event ids are "<run>-<sequence>" with a per-team sequence, so ids from an earlier
+    run of the server, or older than the kept history, are answered with a reset.
+    """
+
+    def __init__(self, history_size=EVENT_HISTORY_SIZE):
+        self.history_size = history_size
+        self._run = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._history = {}
+        self._sequences = {}
+        self._subscribers = {}
+
+    def latest_event_id(self, team_id):
+        with self._lock:
+            return f'{self._run}-{self._sequences.get(team_id, 0)}'
+
+    def publish(self, team_id, event_type, data):
+        with self._lock:
+            sequence = self._sequences.get(team_id, 0) + 1
+            self._sequences[team_id] = sequence
+            event = (f'{self._run}-{sequence}', event_type, data)
+            self._history.setdefault(team_id, deque(maxlen=self.history_size)).append((sequence, event))
+            subscribers = list(self._subscribers.get(team_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.lagged = True
+        return event[0]
+
+    def _backlog(self, team_id, last_event_id):
+        """Events after last_event_id, or a single reset event when they are no longer all known."""
+        sequence = self._sequences.get(team_id, 0)
+        latest = f'{self._run}-{sequence}'
+        run, _, last_sequence = (last_event_id or '').partition('-')
+        if run != self._run or not last_sequence.isdigit() or int(last_sequence) > sequence:
+            return [(latest, RESET_EVENT, {})]
+
+        last_sequence = int(last_sequence)
+        history = self._history.get(team_id, ())
+        if history and history[0][0] > last_sequence + 1:
+            return [(latest, RESET_EVENT, {})]
+        return [event for event_sequence, event in history if event_sequence > last_sequence]
+
+    def subscribe(self, team_id, last_event_id=None):
+        with self._lock:
+            backlog = self._backlog(team_id, last_event_id) if last_event_id else []
+            subscription = InProcessSubscription(self, team_id, backlog)
+            self._subscribers.setdefault(team_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.team_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.team_id]
+
+
+def _stream_id(value):
+    """Redis stream id as a comparable tuple, None when malformed."""
+    milliseconds, _, sequence = (value or '').partition('-')
+    if not milliseconds.isdigit() or not sequence.isdigit():
+        return None
+    return int(milliseconds), int(sequence)
+
+
+class RedisSubscription:
+    def __init__(self, redis, key, last_event_id):
+        self._redis = redis
+        self._key = key
+        self._backlog = deque()
+
+        latest = self._redis.xrevrange(key, count=1)
+        self.position = latest[0][0] if latest else '0-0'
+        if last_event_id:
+            first = self._redis.xrange(key, count=1)
+            last = _stream_id(last_event_id)
+            if last is None or last > _stream_id(self.position) or (first and last < _stream_id(first[0][0])):
+                self._backlog.append((self.position, RESET_EVENT, {}))
+            else:
+                self.position = last_event_id
+
+    def get(self, timeout):
+        if not self._backlog:
+            streams = self._redis.xread({self._key: self.position}, count=100, block=int(timeout * 1000))
+            for _, entries in streams:
+                for entry_id, fields in entries:
+                    self._backlog.append((entry_id, fields['type'], json.loads(fields['data'])))
+                    self.position = entry_id
+        return self._backlog.popleft() if self._backlog else None
+
+    def close(self):
+        pass
+
+
+class RedisMessageHub:
+    """Same interface as InProcessMessageHub, backed by a capped Redis stream per team.
+
+    Stream entry ids double as event ids, so clients can resume against any process.
+    """
+
+    def __init__(self, url, history_size=EVENT_HISTORY_SIZE):
+        import redis
+        self.history_size = history_size
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(team_id):
+        return f'message_board_events:{team_id}'
+
+    def publish(self, team_id, event_type, data):
+        return self._redis.xadd(
+            self._key(team_id), {'type': event_type, 'data': json.dumps(data)},
+            maxlen=self.history_size, approximate=True
+        )
+
+    def subscribe(self, team_id, last_event_id=None):
+        return RedisSubscription(self._redis, self._key(team_id), last_event_id)
+
+
+message_event_hub = RedisMessageHub(MESSAGE_EVENTS_REDIS_URL) if MESSAGE_EVENTS_REDIS_URL else InProcessMessageHub()
+
+
+def publish_message_event(team_id, event_type, data):
+    # a broker hiccup must never fail the write that was already committed
+    try:
+        message_event_hub.publish(team_id, event_type, data)
+    except Exception as e:
+        print(f"Failed to publish message board event: {e}")
+
+
+def stream_message_events(team_id, last_event_id=None, heartbeat_seconds=HEARTBEAT_SECONDS):
+    """Yields the SSE stream of a team's message board, with keep-alive comments while idle."""
+    subscription = message_event_hub.subscribe(team_id, last_event_id)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            event = subscription.get(heartbeat_seconds)
+            yield format_sse(*event) if event else ': keep-alive\n\n'
+    finally:
+        subscription.close()
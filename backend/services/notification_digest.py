@@ -0,0 +1,120 @@
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from models.notification_digest import NotificationDigest
+from services.expo_push import send_push_messages
+from services.push_receipts import prune_unregistered, record_tickets
+from services.push_recipients import team_recipients
+
+DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_SECONDS', 300))
+MAX_DIGEST_WINDOW_SECONDS = 24 * 3600
+DIGEST_CHECK_SECONDS = int(os.getenv('NOTIFICATION_DIGEST_CHECK_SECONDS', 30))
+MAX_DIGEST_ITEMS = 5  # newest notifications listed in a combined push
+MAX_BODY_LENGTH = 300
+CLAIM_TIMEOUT_SECONDS = 600  # claims older than this belong to a sender that died
+MAX_UPSERT_ATTEMPTS = 3
+DUPLICATE_KEY_ERROR = 11000
+
+
+def add_to_digests(team_id, title, body, data=None, window_seconds=DIGEST_WINDOW_SECONDS):
+    """Adds a notification to the open digest of every recipient of a team, returns the number of recipients.
+
+    A recipient's digest is sent window_seconds after its first notification,
+    whatever arrives in between is folded into the same push.
+    """
+    if not 0 < window_seconds <= MAX_DIGEST_WINDOW_SECONDS:
+        raise ValueError(f"digest window must be between 1 and {MAX_DIGEST_WINDOW_SECONDS} seconds")
+
+    now = datetime.utcnow()
+    item = {'title': title, 'body': body, 'data': data or {}, 'created_at': now}
+    operations = [UpdateOne(
+        {'token': recipient['token'], 'claim_id': None},
+        {
+            '$push': {'items': {'$each': [item], '$slice': -MAX_DIGEST_ITEMS}},
+            '$inc': {'count': 1},
+            '$setOnInsert': {'email': recipient['email'], 'send_after': now + timedelta(seconds=window_seconds), 'created_at': now}
+        },
+        upsert=True
+    ) for recipient in team_recipients(team_id)]
+    if operations:
+        _bulk_upsert(NotificationDigest._get_collection(), operations)
+    return len(operations)
+
+
+def _bulk_upsert(collection, operations):
+    """Runs the upserts, retrying those that lost an insert race on the (token, claim_id) index.
+
+    Two concurrent upserts for a token without an open digest both try to insert one;
+    the loser's retry then matches the winner's digest and updates it.
+    """
+    for attempt in range(MAX_UPSERT_ATTEMPTS):
+        try:
+            collection.bulk_write(operations, ordered=False)
+            return
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if attempt == MAX_UPSERT_ATTEMPTS - 1 or any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            operations = [operations[error['index']] for error in errors]
+
+
+def digest_message(digest):
+    """The single push summarizing a digest, a lone notification is sent as it was."""
+    items = digest['items']
+    if digest['count'] == 1:
+        item = items[-1]
+        return {'to': digest['token'], 'title': item['title'], 'body': item['body'], 'data': item.get('data') or {}, 'sound': 'default'}
+
+    lines = [f"{item['title']}: {item['body']}" for item in reversed(items)]
+    if digest['count'] > len(items):
+        lines.append(f"and {digest['count'] - len(items)} more")
+    body = '\n'.join(lines)
+    if len(body) > MAX_BODY_LENGTH:
+        body = body[:MAX_BODY_LENGTH - 1] + '…'
+    return {
+        'to': digest['token'],
+        'title': f"{digest['count']} new notifications",
+        'body': body,
+        'data': {'type': 'digest', 'count': digest['count'], 'items': [item.get('data') or {} for item in items]},
+        'sound': 'default'
+    }
+
+
+def send_due_digests():
+    """Claims every digest whose window is over and sends one push per recipient."""
+    collection = NotificationDigest._get_collection()
+    now = datetime.utcnow()
+
+    # a token may have a stale claimed digest next to its open one, and (token, claim_id) is
+    # unique, so stale digests are reclaimed one by one, each under a claim id of its own
+    claim_ids = []
+    while True:
+        claim_id = ObjectId()
+        if not collection.find_one_and_update(
+            {'claim_id': {'$ne': None}, 'claimed_at': {'$lt': now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS)}},
+            {'$set': {'claim_id': claim_id, 'claimed_at': now}},
+            projection={'_id': 1}
+        ):
+            break
+        claim_ids.append(claim_id)
+
+    # open digests are unique per token, so they can share one claim id
+    claim_id = ObjectId()
+    collection.update_many(
+        {'claim_id': None, 'send_after': {'$lte': now}},
+        {'$set': {'claim_id': claim_id, 'claimed_at': now}}
+    )
+    claim_ids.append(claim_id)
+
+    claimed = {'claim_id': {'$in': claim_ids}}
+    digests = list(collection.find(claimed, {'token': 1, 'items': 1, 'count': 1}))
+    if not digests:
+        return 0
+
+    tickets = send_push_messages([digest_message(digest) for digest in digests])
+    record_tickets(tickets)
+    prune_unregistered(tickets)
+    collection.delete_many(claimed)
+    return len(digests)
@@ -0,0 +1,146 @@
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from models.notification_job import NotificationJob
+from services.expo_push import send_push_messages
+from services.push_receipts import prune_unregistered, record_tickets
+from services.push_recipients import team_push_tokens
+
+NOTIFICATION_WORKERS = int(os.getenv('NOTIFICATION_WORKERS', 2))  # 0 when a separate process runs `flask process-notifications --watch`
+POLL_SECONDS = int(os.getenv('NOTIFICATION_POLL_SECONDS', 5))
+LEASE_SECONDS = int(os.getenv('NOTIFICATION_LEASE_SECONDS', 120))
+MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 3))
+RETRY_DELAY_SECONDS = int(os.getenv('NOTIFICATION_RETRY_DELAY_SECONDS', 30))  # doubled on every further attempt
+PROGRESS_CHUNK = 500  # recipients sent between two progress updates of a job
+MAX_JOB_TICKETS = 100  # failed tickets kept on a job, accepted ones are stored as PushTickets
+
+_wake_workers = threading.Event()
+
+
+def enqueue_notification(team_name, team_id, title, body, data=None):
+    job = NotificationJob(team_name=team_name, team_id=team_id, title=title, body=body, data=data or {})
+    job.save()
+    _wake_workers.set()
+    return job
+
+
+def claim_next_job():
+    """Atomically takes the oldest due queued job, or a running one whose worker lost its lease."""
+    now = datetime.utcnow()
+    return NotificationJob._get_collection().find_one_and_update(
+        {'$or': [
+            {'status': 'queued', 'available_at': {'$lte': now}},
+            {'status': 'running', 'locked_until': {'$lt': now}}
+        ]},
+        {
+            '$set': {'status': 'running', 'started_at': now, 'locked_until': now + timedelta(seconds=LEASE_SECONDS)},
+            '$inc': {'attempts': 1}
+        },
+        sort=[('created_at', 1)],
+        projection={'tickets': 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def process_job(job):
+    """Sends a claimed job, recording progress after every chunk of recipients.
+
+    Recipients are sent in token order and the job keeps the last token sent (cursor),
+    so a retried job resumes after the recipients a previous attempt already got to,
+    even when the team's recipients changed in between.
+    """
+    collection = NotificationJob._get_collection()
+    try:
+        tokens = sorted(set(team_push_tokens(job['team_id'])))
+        start = bisect_right(tokens, job['cursor']) if job.get('cursor') else 0
+        collection.update_one({'_id': job['_id']}, {'$set': {'total': job.get('sent', 0) + job.get('failed', 0) + len(tokens) - start}})
+
+        for offset in range(start, len(tokens), PROGRESS_CHUNK):
+            messages = [{
+                'to': token,
+                'title': job['title'],
+                'body': job['body'],
+                'data': job.get('data') or {},
+                'sound': 'default'
+            } for token in tokens[offset:offset + PROGRESS_CHUNK]]
+            tickets = send_push_messages(messages)
+            record_tickets(tickets, job['_id'])
+            prune_unregistered(tickets)
+            failed_tickets = [ticket for ticket in tickets if ticket.get('status') != 'ok']
+            collection.update_one({'_id': job['_id']}, {
+                '$inc': {'sent': len(tickets) - len(failed_tickets), 'failed': len(failed_tickets)},
+                '$push': {'tickets': {'$each': failed_tickets, '$slice': -MAX_JOB_TICKETS}},
+                '$set': {'cursor': messages[-1]['to'], 'locked_until': datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)}
+            })
+
+        collection.update_one({'_id': job['_id']}, {'$set': {'status': 'completed', 'finished_at': datetime.utcnow()}})
+    except Exception as e:
+        print(f"Error processing notification job {job['_id']}: {str(e)}")
+        retry = job.get('attempts', 1) < MAX_ATTEMPTS
+        update = {'status': 'queued' if retry else 'failed', 'error': str(e)}
+        if retry:
+            delay = RETRY_DELAY_SECONDS * 2 ** (job.get('attempts', 1) - 1)
+            update['available_at'] = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            update['finished_at'] = datetime.utcnow()
+        collection.update_one({'_id': job['_id']}, {'$set': update})
+
+
+def process_pending_jobs():
+    """Processes jobs until the queue is empty, returns how many were processed."""
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if not job:
+            return processed
+        process_job(job)
+        processed += 1
+
+
+def run_worker(stop_event):
+    while not stop_event.is_set():
+        try:
+            process_pending_jobs()
+        except Exception as e:
+            print(f"Notification worker error: {str(e)}")
+        # woken right away by enqueues in this process, polling covers the other processes
+        _wake_workers.wait(POLL_SECONDS)
+        _wake_workers.clear()
+
+
+def start_notification_workers(count=NOTIFICATION_WORKERS):
+    stop_event = threading.Event()
+    for number in range(count):
+        worker = threading.Thread(target=run_worker, args=(stop_event,), name=f'notification-worker-{number}', daemon=True)
+        worker.start()
+    return stop_event
+
+
+def job_status(job_id, include_tickets=False):
+    if not ObjectId.is_valid(job_id):
+        raise ValueError('Notification job not found')
+    job = NotificationJob.objects(id=job_id)
+    if not include_tickets:
+        job = job.exclude('tickets')
+    job = job.as_pymongo().first()
+    if not job:
+        raise ValueError('Notification job not found')
+
+    status = {
+        'job_id': str(job['_id']),
+        'team_name': job['team_name'],
+        'status': job['status'],
+        'attempts': job.get('attempts', 0),
+        'total': job.get('total', 0),
+        'sent': job.get('sent', 0),
+        'failed': job.get('failed', 0),
+        'error': job.get('error'),
+    }
+    for field in ('created_at', 'started_at', 'finished_at'):
+        status[field] = job[field].isoformat() if job.get(field) else None
+    if include_tickets:
+        status['tickets'] = job.get('tickets', [])
+    return status
@@ -0,0 +1,107 @@
+import os
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from models.management import Management
+from models.player import Player
+from models.push_ticket import PushTicket
+from services.expo_push import EXPO_RECEIPTS_BATCH_SIZE, get_push_receipts
+from services.push_recipients import invalidate_team_recipients
+
+# Expo recommends waiting about 15 minutes before asking for receipts
+RECEIPT_DELAY_SECONDS = int(os.getenv('PUSH_RECEIPT_DELAY_SECONDS', 15 * 60))
+RECEIPT_CHECK_SECONDS = int(os.getenv('PUSH_RECEIPT_CHECK_SECONDS', 10 * 60))
+
+
+def ticket_error(ticket):
+    return (ticket.get('details') or {}).get('error')
+
+
+def record_tickets(tickets, job_id=None):
+    """Stores the accepted tickets of a send so their receipts can be checked later."""
+    documents = [{
+        'ticket_id': ticket['id'],
+        'token': ticket['to'],
+        'job_id': job_id,
+        'status': 'pending',
+        'created_at': datetime.utcnow()
+    } for ticket in tickets if ticket.get('status') == 'ok' and ticket.get('id')]
+    if not documents:
+        return 0
+    try:
+        return len(PushTicket._get_collection().insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # a ticket recorded twice by a retried job
+        return e.details.get('nInserted', 0)
+
+
+def prune_push_tokens(tokens):
+    """Clears tokens Expo reported as no longer registered, returns how many users had one."""
+    tokens = list(set(tokens))
+    if not tokens:
+        return 0
+    pruned = 0
+    for model in (Player, Management):
+        pruned += model.objects(push_token__in=tokens).update(set__push_token=None)
+    # pruning is rare, and the tokens' teams aren't known here
+    invalidate_team_recipients()
+    print(f"Cleared {pruned} unregistered push tokens")
+    return pruned
+
+
+def prune_unregistered(tickets):
+    """Prunes the tokens of tickets rejected right away with DeviceNotRegistered."""
+    return prune_push_tokens(ticket['to'] for ticket in tickets if ticket_error(ticket) == 'DeviceNotRegistered')
+
+
+def check_push_receipts(delay_seconds=RECEIPT_DELAY_SECONDS):
+    """Fetches the receipts of pending tickets old enough to have one, in batches.
+
+    Tickets whose receipt isn't ready yet stay pending until the next check, tickets
+    never answered expire with the collection's TTL.
+    """
+    collection = PushTicket._get_collection()
+    cutoff = datetime.utcnow() - timedelta(seconds=delay_seconds)
+    pending = collection.find(
+        {'status': 'pending', 'created_at': {'$lte': cutoff}}, {'ticket_id': 1, 'token': 1}
+    ).batch_size(EXPO_RECEIPTS_BATCH_SIZE)
+
+    summary = {'checked': 0, 'ok': 0, 'error': 0, 'pruned': 0}
+    batch = []
+    for ticket in pending:
+        batch.append(ticket)
+        if len(batch) >= EXPO_RECEIPTS_BATCH_SIZE:
+            _apply_receipts(collection, batch, summary)
+            batch = []
+    if batch:
+        _apply_receipts(collection, batch, summary)
+    return summary
+
+
+def _apply_receipts(collection, tickets, summary):
+    try:
+        receipts = get_push_receipts([ticket['ticket_id'] for ticket in tickets])
+    except Exception as e:
+        print(f"Error fetching push receipts: {str(e)}")
+        return
+
+    now = datetime.utcnow()
+    operations, unregistered = [], []
+    for ticket in tickets:
+        receipt = receipts.get(ticket['ticket_id'])
+        if not receipt:
+            continue
+        status = 'ok' if receipt.get('status') == 'ok' else 'error'
+        update = {'status': status, 'checked_at': now}
+        if status == 'error':
+            update['error'] = ticket_error(receipt)
+            update['message'] = receipt.get('message')
+            if update['error'] == 'DeviceNotRegistered':
+                unregistered.append(ticket['token'])
+        operations.append(UpdateOne({'_id': ticket['_id']}, {'$set': update}))
+        summary[status] += 1
+
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    summary['checked'] += len(operations)
+    summary['pruned'] += prune_push_tokens(unregistered)
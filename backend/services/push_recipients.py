@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from bson import ObjectId
+from models.management import Management
+from models.player import Player
+
+RECIPIENT_CACHE_SECONDS = int(os.getenv('PUSH_RECIPIENT_CACHE_SECONDS', 300))
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def normalize_team_id(team_id):
+    """Team ids as stored: an ObjectId, or the raw value when it isn't one."""
+    if isinstance(team_id, ObjectId):
+        return team_id
+    return ObjectId(team_id) if ObjectId.is_valid(team_id) else team_id
+
+
+def load_team_recipients(team_id):
+    """Email and push token of every player and manager of a team that has a token.
+
+    A range on push_token ($gt '') only matches non-empty strings, so the query is bounded
+    on both fields of the (team_id, push_token) index and reads nothing but the two fields.
+    """
+    team_id = normalize_team_id(team_id)
+    # documents written outside mongoengine may still hold the team id as a string
+    team_ids = [team_id, str(team_id)] if isinstance(team_id, ObjectId) else [team_id]
+    query = {'team_id': {'$in': team_ids}, 'push_token': {'$gt': ''}}
+    recipients = {}
+    for model in (Player, Management):
+        for member in model._get_collection().find(query, {'_id': 0, 'email': 1, 'push_token': 1}):
+            recipients.setdefault(member['push_token'], member.get('email'))
+    return [{'email': email, 'token': token} for token, email in sorted(recipients.items())]
+
+
+def team_recipients(team_id):
+    """Cached load_team_recipients, refreshed after RECIPIENT_CACHE_SECONDS or on invalidation."""
+    key = str(team_id)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    recipients = load_team_recipients(team_id)
+    with _cache_lock:
+        _cache[key] = (now + RECIPIENT_CACHE_SECONDS, recipients)
+    return recipients
+
+
+def team_push_tokens(team_id):
+    """Push tokens of every player and manager of a team, in a stable order."""
+    return [recipient['token'] for recipient in team_recipients(team_id)]
+
+
+def invalidate_team_recipients(team_id=None):
+    """Drops the cached recipients of a team, or of every team when no team is given."""
+    with _cache_lock:
+        if team_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(team_id), None)
+
+
+def normalize_team_ids():
+    """Rewrites team ids stored as strings to ObjectIds, returns the number of users fixed."""
+    fixed = 0
+    for model in (Player, Management):
+        collection = model._get_collection()
+        for member in collection.find({'team_id': {'$type': 'string'}}, {'team_id': 1}):
+            if ObjectId.is_valid(member['team_id']):
+                fixed += collection.update_one({'_id': member['_id']}, {'$set': {'team_id': ObjectId(member['team_id'])}}).modified_count
+    invalidate_team_recipients()
+    return fixed
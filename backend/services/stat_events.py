@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import Counter
+from bson import ObjectId
+from services.stats_update import check_key, update_game
+
+# Counters incremented by every point-by-point action
+EVENT_ACTIONS = {
+    'kill': [('attack', 'attempts'), ('attack', 'kills')],
+    'attack_error': [('attack', 'attempts'), ('attack', 'errors')],
+    'attack_attempt': [('attack', 'attempts')],
+    'ace': [('serve', 'attempts'), ('serve', 'aces')],
+    'serve_error': [('serve', 'attempts'), ('serve', 'errors')],
+    'serve': [('serve', 'attempts')],
+    'receive_one': [('serve_recieves', 'attempts'), ('serve_recieves', 'one_balls')],
+    'receive_two': [('serve_recieves', 'attempts'), ('serve_recieves', 'two_balls')],
+    'receive_three': [('serve_recieves', 'attempts'), ('serve_recieves', 'three_balls')],
+    'receive_error': [('serve_recieves', 'attempts'), ('serve_recieves', 'errors')],
+    'dig': [('digs', 'attempts')],
+    'dig_error': [('digs', 'attempts'), ('digs', 'errors')],
+    'assist': [('setting', 'attempts'), ('setting', 'assists')],
+    'set_error': [('setting', 'attempts'), ('setting', 'errors')],
+    'set_attempt': [('setting', 'attempts')],
+    'block': [('blocks', 'attempts'), ('blocks', 'kills')],
+    'block_error': [('blocks', 'attempts'), ('blocks', 'errors')],
+    'block_attempt': [('blocks', 'attempts')],
+}
+
+FLUSH_INTERVAL_SECONDS = int(os.getenv('STAT_EVENTS_FLUSH_SECONDS', 2))
+MAX_BUFFERED_EVENTS = int(os.getenv('STAT_EVENTS_MAX_BUFFERED', 50))
+
+
+def event_increments(event):
+    """Validates a single event and returns its $inc paths."""
+    game_id = event.get('game_id')
+    player_id = event.get('player_id')
+    action = event.get('action')
+    count = event.get('count', 1)
+
+    if not ObjectId.is_valid(game_id):
+        raise ValueError(f"Invalid game_id: {game_id!r}")
+    check_key(player_id)
+    if action not in EVENT_ACTIONS:
+        raise ValueError(f"Unknown action: {action!r}")
+    if not isinstance(count, int) or isinstance(count, bool) or count == 0:
+        raise ValueError("count must be a non-zero integer")
+
+    return game_id, {f'team_stats.{player_id}.{category}.{field}': count for category, field in EVENT_ACTIONS[action]}
+
+
+class StatEventBuffer:
+    """Per-game in-memory buffer of pending $inc operations.
+
+    Events are merged as they arrive, so a game with hundreds of buffered taps is
+    flushed as a single update. Each web worker process keeps its own buffer.
+    """
+
+    def __init__(self, max_events=MAX_BUFFERED_EVENTS):
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._increments = {}
+        self._event_counts = Counter()
+
+    def add(self, game_id, increments):
+        """Buffers the increments and returns True when the game reached the flush threshold."""
+        with self._lock:
+            self._increments.setdefault(game_id, Counter()).update(increments)
+            self._event_counts[game_id] += 1
+            return self._event_counts[game_id] >= self.max_events
+
+    def _take(self, game_ids=None):
+        with self._lock:
+            game_ids = list(self._increments) if game_ids is None else [g for g in game_ids if g in self._increments]
+            taken = {game_id: self._increments.pop(game_id) for game_id in game_ids}
+            for game_id in game_ids:
+                self._event_counts.pop(game_id, None)
+            return taken
+
+    def flush(self, game_ids=None):
+        """Writes the buffered increments of the given games (default all), returns the number of games written."""
+        flushed = 0
+        for game_id, increments in self._take(game_ids).items():
+            inc_operators = {path: value for path, value in increments.items() if value}
+            if not inc_operators:
+                continue
+            try:
+                if update_game(game_id, {}, inc_operators) is None:
+                    print(f"Dropping stat events of missing game {game_id}")
+                    continue
+                flushed += 1
+            except Exception as e:
+                # update_game only raises when the $inc wasn't applied, so the events are
+                # kept for the next flush without risking double counting
+                print(f"Error flushing stat events of game {game_id}: {e}")
+                with self._lock:
+                    self._increments.setdefault(game_id, Counter()).update(increments)
+        return flushed
+
+    def pending(self, game_id):
+        with self._lock:
+            return self._event_counts.get(game_id, 0)
+
+
+stat_event_buffer = StatEventBuffer()
+
+
+def flush_stat_events():
+    stat_event_buffer.flush()
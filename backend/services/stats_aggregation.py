@@ -0,0 +1,115 @@
+from pymongo.errors import OperationFailure
+from models.game_statistics import GameStatistics
+from services.stats_fields import COUNTER_FIELDS, empty_totals, add_player_stats, compute_derived
+from services.stats_opponents import normalize_opponent
+
+
+def filter_games(team_id, start_date=None, end_date=None, opponent=None):
+    """Returns the GameStatistics queryset of a team, narrowed by date range and opponent.
+
+    The opponent is matched on its normalized key, as by the opponent routes.
+    """
+    filters = {'team_id': team_id}
+    if start_date:
+        filters['game_date__gte'] = start_date
+    if end_date:
+        filters['game_date__lte'] = end_date
+    if opponent:
+        filters['opponent_key'] = normalize_opponent(opponent)
+    return GameStatistics.objects(**filters)
+
+
+def _flat_key(category, field):
+    return f'{category}__{field}'
+
+
+def build_pipeline():
+    # one $sum per counter, grouped by player after unwinding the team_stats map
+    player_group = {'_id': '$team_stats.k', 'games_played': {'$sum': 1}}
+    for category, fields in COUNTER_FIELDS.items():
+        for field in fields:
+            player_group[_flat_key(category, field)] = {
+                '$sum': {'$ifNull': [f'$team_stats.v.{category}.{field}', 0]}
+            }
+
+    return [
+        {'$facet': {
+            'players': [
+                {'$project': {'team_stats': {'$objectToArray': {'$ifNull': ['$team_stats', {}]}}}},
+                {'$unwind': '$team_stats'},
+                {'$group': player_group},
+            ],
+            'games': [
+                {'$group': {
+                    '_id': None,
+                    'games_played': {'$sum': 1},
+                    'sets_won': {'$sum': {'$ifNull': ['$team_sets_won_count', 0]}},
+                    'sets_lost': {'$sum': {'$ifNull': ['$team_sets_lost_count', 0]}},
+                    'wins': {'$sum': {'$cond': [{'$gt': ['$team_sets_won_count', '$team_sets_lost_count']}, 1, 0]}},
+                    'losses': {'$sum': {'$cond': [{'$lt': ['$team_sets_won_count', '$team_sets_lost_count']}, 1, 0]}},
+                }},
+            ],
+        }},
+    ]
+
+
+def _empty_record():
+    return {'games_played': 0, 'sets_won': 0, 'sets_lost': 0, 'wins': 0, 'losses': 0}
+
+
+def _aggregate_with_pipeline(games):
+    result = next(games.aggregate(build_pipeline()), {'players': [], 'games': []})
+
+    players = {}
+    for row in result['players']:
+        totals = empty_totals()
+        for category, fields in COUNTER_FIELDS.items():
+            for field in fields:
+                totals[category][field] = row.get(_flat_key(category, field), 0)
+        players[row['_id']] = {'games_played': row['games_played'], **totals}
+
+    record = _empty_record()
+    if result['games']:
+        record.update({key: value for key, value in result['games'][0].items() if key != '_id'})
+    return record, players
+
+
+def _aggregate_in_process(games):
+    record = _empty_record()
+    players = {}
+    raw_games = games.only('team_sets_won_count', 'team_sets_lost_count', 'team_stats').as_pymongo()
+    for game in raw_games:
+        won = game.get('team_sets_won_count') or 0
+        lost = game.get('team_sets_lost_count') or 0
+        record['games_played'] += 1
+        record['sets_won'] += won
+        record['sets_lost'] += lost
+        record['wins'] += int(won > lost)
+        record['losses'] += int(won < lost)
+
+        for player_id, player_stats in (game.get('team_stats') or {}).items():
+            player = players.setdefault(player_id, {'games_played': 0, **empty_totals()})
+            player['games_played'] += 1
+            add_player_stats(player, player_stats)
+    return record, players
+
+
+def aggregate_season(games):
+    """Sums per-player and per-team counters for the given games and recomputes derived stats.
+
+    Runs as a single MongoDB aggregation, falling back to summing the raw documents
+    in process when the server (or a mock) can't run the pipeline.
+    """
+    try:
+        record, players = _aggregate_with_pipeline(games)
+    except (OperationFailure, NotImplementedError) as e:
+        print(f"Aggregation pipeline failed, summing in process: {e}")
+        record, players = _aggregate_in_process(games)
+
+    team_totals = empty_totals()
+    for player in players.values():
+        add_player_stats(team_totals, player)
+        compute_derived(player)
+    compute_derived(team_totals)
+
+    return {**record, 'team_totals': team_totals, 'players': players}
@@ -0,0 +1,226 @@
+import time
+import numpy as np
+from models.game_statistics import GameStatistics
+from services.stats_fields import COUNTER_FIELDS
+
+# One column per counter, named like the update paths ("attack.kills")
+COLUMNS = [f'{category}.{field}' for category, fields in COUNTER_FIELDS.items() for field in fields]
+COLUMN_INDEX = {column: index for index, column in enumerate(COLUMNS)}
+
+# Derived metrics as (numerator weights, denominator column, scale), matching services.stats_fields
+METRICS = {
+    'kill_percentage': ({'attack.kills': 1}, 'attack.attempts', 100),
+    'ace_percentage': ({'serve.aces': 1}, 'serve.attempts', 100),
+    'receive_efficiency': (
+        {'serve_recieves.one_balls': 1, 'serve_recieves.two_balls': 2, 'serve_recieves.three_balls': 3, 'serve_recieves.errors': -1},
+        'serve_recieves.attempts', 1
+    ),
+    'dig_efficiency': ({'digs.attempts': 1, 'digs.errors': -1}, 'digs.attempts', 100),
+}
+
+
+class StatMatrix:
+    """Compact column store of a team's history, one row per (game, player).
+
+    values[row, column] holds the counter COLUMNS[column]; game_codes and player_codes
+    index into game_dates and players, and rows are ordered by game date.
+    """
+
+    def __init__(self, values, game_codes, player_codes, game_dates, players):
+        self.values = values
+        self.game_codes = game_codes
+        self.player_codes = player_codes
+        self.game_dates = game_dates
+        self.players = players
+        self.player_index = {player_id: code for code, player_id in enumerate(players)}
+
+    @classmethod
+    def from_games(cls, raw_games):
+        rows, game_codes, player_codes, game_dates = [], [], [], []
+        player_index = {}
+        for game_code, game in enumerate(raw_games):
+            game_dates.append(game['game_date'])
+            for player_id, player_stats in (game.get('team_stats') or {}).items():
+                rows.append([
+                    ((player_stats.get(category) or {}).get(field) or 0)
+                    for category, fields in COUNTER_FIELDS.items() for field in fields
+                ])
+                game_codes.append(game_code)
+                player_codes.append(player_index.setdefault(player_id, len(player_index)))
+
+        return cls(
+            values=np.array(rows, dtype=np.float64).reshape(len(rows), len(COLUMNS)),
+            game_codes=np.array(game_codes, dtype=np.int32),
+            player_codes=np.array(player_codes, dtype=np.int32),
+            game_dates=np.array(game_dates, dtype='datetime64[ms]'),
+            players=list(player_index),
+        )
+
+    @classmethod
+    def load(cls, team_id):
+        games = GameStatistics.objects(team_id=team_id).order_by('game_date').only('game_date', 'team_stats')
+        return cls.from_games(games.as_pymongo())
+
+    def stat_vector(self, stat, rows=slice(None)):
+        """Numerator and denominator vectors of a counter column or derived metric."""
+        if stat in COLUMN_INDEX:
+            return self.values[rows, COLUMN_INDEX[stat]], None, 1
+        if stat not in METRICS:
+            raise ValueError(f"Unknown stat: {stat}")
+        weights, denominator, scale = METRICS[stat]
+        weight_vector = np.zeros(len(COLUMNS))
+        for column, weight in weights.items():
+            weight_vector[COLUMN_INDEX[column]] = weight
+        return self.values[rows] @ weight_vector, self.values[rows, COLUMN_INDEX[denominator]], scale
+
+    def player_code(self, player_id):
+        if player_id not in self.player_index:
+            raise ValueError(f"Unknown player: {player_id}")
+        return self.player_index[player_id]
+
+    def player_rows(self, player_id):
+        return np.flatnonzero(self.player_codes == self.player_code(player_id))
+
+
+def _safe_ratio(numerator, denominator, scale):
+    ratio = np.divide(numerator * scale, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator != 0)
+    return np.round(ratio, 2)
+
+
+def rolling_average(matrix, player_id, stat, window=5):
+    """Per-game rolling value of a stat for one player, over their last `window` games.
+
+    Counters are averaged per game; derived metrics are recomputed from the summed
+    counters of the window, so a 0/0 game doesn't drag the percentage down.
+    """
+    rows = matrix.player_rows(player_id)
+    numerator, denominator, scale = matrix.stat_vector(stat, rows)
+    window = max(1, min(window, len(rows)))
+
+    def window_sums(vector):
+        sums = np.cumsum(np.concatenate(([0.0], vector)))
+        return sums[window:] - sums[:-window]
+
+    if denominator is None:
+        values = np.round(window_sums(numerator) / window, 2)
+    else:
+        values = _safe_ratio(window_sums(numerator), window_sums(denominator), scale)
+
+    dates = matrix.game_dates[matrix.game_codes[rows]][window - 1:]
+    return [{'game_date': str(date), 'value': float(value)} for date, value in zip(dates, values)]
+
+
+def player_totals(matrix):
+    """Sums every counter per player, shape (players, columns)."""
+    return np.column_stack([
+        np.bincount(matrix.player_codes, weights=matrix.values[:, column], minlength=len(matrix.players))
+        for column in range(len(COLUMNS))
+    ]).reshape(len(matrix.players), len(COLUMNS))
+
+
+def percentiles(matrix, stat, points=(25, 50, 75, 90)):
+    """Distribution of a stat across the team's players and each player's percentile rank."""
+    totals_matrix = StatMatrix(player_totals(matrix), None, None, None, matrix.players)
+    numerator, denominator, scale = totals_matrix.stat_vector(stat)
+    player_values = numerator if denominator is None else _safe_ratio(numerator, denominator, scale)
+
+    if not len(player_values):
+        return {'stat': stat, 'percentiles': {}, 'players': {}}
+
+    order = np.argsort(player_values, kind='stable')
+    ranks = np.empty(len(order))
+    ranks[order] = np.arange(len(order))
+    ranks = np.round(ranks / max(len(order) - 1, 1) * 100, 2)
+
+    return {
+        'stat': stat,
+        'percentiles': {str(point): float(value) for point, value in zip(points, np.percentile(player_values, points))},
+        'players': {
+            player_id: {'value': float(player_values[code]), 'percentile_rank': float(ranks[code])}
+            for code, player_id in enumerate(matrix.players)
+        }
+    }
+
+
+def compare_players(matrix, player_a, player_b):
+    """Head-to-head per-game averages and derived metrics of two players."""
+    totals = player_totals(matrix)
+    games_played = np.bincount(matrix.player_codes, minlength=len(matrix.players))
+
+    def summary(player_id):
+        code = matrix.player_code(player_id)
+        games = int(games_played[code])
+        player_matrix = StatMatrix(totals[code:code + 1], None, None, None, [player_id])
+        averages = totals[code] / max(games, 1)
+        metrics = {}
+        for metric in METRICS:
+            numerator, denominator, scale = player_matrix.stat_vector(metric)
+            metrics[metric] = float(_safe_ratio(numerator, denominator, scale)[0])
+        return {
+            'games_played': games,
+            'averages': {column: float(round(value, 2)) for column, value in zip(COLUMNS, averages)},
+            'metrics': metrics,
+        }
+
+    a, b = summary(player_a), summary(player_b)
+    return {
+        'players': {player_a: a, player_b: b},
+        'difference': {
+            'averages': {column: round(a['averages'][column] - b['averages'][column], 2) for column in COLUMNS},
+            'metrics': {metric: round(a['metrics'][metric] - b['metrics'][metric], 2) for metric in METRICS},
+        }
+    }
+
+
+def set_trends(team_id):
+    """Average score, point differential and win rate per set number across a team's games."""
+    games = GameStatistics.objects(team_id=team_id).only('sets_scores').as_pymongo()
+    set_numbers, team_scores, opposite_scores = [], [], []
+    for game in games:
+        for set_number, score in (game.get('sets_scores') or {}).items():
+            if not str(set_number).isdigit():
+                continue
+            set_numbers.append(int(set_number))
+            team_scores.append(score.get('team_score') or 0)
+            opposite_scores.append(score.get('opposite_team_score') or 0)
+
+    set_numbers = np.array(set_numbers, dtype=np.int32)
+    team_scores = np.array(team_scores, dtype=np.float64)
+    opposite_scores = np.array(opposite_scores, dtype=np.float64)
+
+    trends = {}
+    for set_number in np.unique(set_numbers):
+        mask = set_numbers == set_number
+        trends[str(set_number)] = {
+            'sets_played': int(mask.sum()),
+            'avg_team_score': round(float(team_scores[mask].mean()), 2),
+            'avg_opposite_team_score': round(float(opposite_scores[mask].mean()), 2),
+            'avg_point_differential': round(float((team_scores[mask] - opposite_scores[mask]).mean()), 2),
+            'win_rate': round(float((team_scores[mask] > opposite_scores[mask]).mean() * 100), 2),
+        }
+    return trends
+
+
+def benchmark_analytics(games=5000, players=14, repeat=5, seed=0):
+    """Times the analytics on a synthetic history of `games` games with `players` players each."""
+    rng = np.random.default_rng(seed)
+    rows = games * players
+    matrix = StatMatrix(
+        values=rng.integers(0, 30, size=(rows, len(COLUMNS))).astype(np.float64),
+        game_codes=np.repeat(np.arange(games, dtype=np.int32), players),
+        player_codes=np.tile(np.arange(players, dtype=np.int32), games),
+        game_dates=np.arange(games).astype('datetime64[D]').astype('datetime64[ms]'),
+        players=[f'player{code}' for code in range(players)],
+    )
+
+    timings = {}
+    for name, run in (
+        ('rolling_average', lambda: rolling_average(matrix, 'player0', 'kill_percentage', 10)),
+        ('percentiles', lambda: percentiles(matrix, 'receive_efficiency')),
+        ('compare_players', lambda: compare_players(matrix, 'player0', 'player1')),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        timings[name] = round((time.perf_counter() - start) / repeat * 1000, 3)
+    return timings
@@ -0,0 +1,104 @@
+import csv
+import io
+import zlib
+from models.game_statistics import GameStatistics
+from services.stats_fields import COUNTER_FIELDS, DERIVED_FIELDS
+from services.stats_serializer import dumps, serialize_game
+
+BATCH_SIZE = 200
+MAX_SETS = 5  # a volleyball match has at most 5 sets
+
+# Same layout services.stats_import.read_csv reads back, one row per player of a game
+CSV_GAME_COLUMNS = ['game_id', 'team_id', 'opposite_team_name', 'game_date', 'team_sets_won_count', 'team_sets_lost_count']
+CSV_SET_COLUMNS = [
+    f'sets_scores.{set_number}.{field}'
+    for set_number in range(1, MAX_SETS + 1) for field in ('team_score', 'opposite_team_score')
+]
+CSV_PLAYER_COLUMNS = ['player_id', 'position', 'starter'] + [
+    f'{category}.{field}'
+    for category, fields in COUNTER_FIELDS.items() for field in fields + DERIVED_FIELDS.get(category, [])
+]
+CSV_COLUMNS = CSV_GAME_COLUMNS + CSV_SET_COLUMNS + CSV_PLAYER_COLUMNS
+
+
+def _team_games(team_id):
+    # a cursor fetching BATCH_SIZE raw documents per round trip, never the whole queryset
+    return GameStatistics.objects(team_id=team_id).order_by('game_date').batch_size(BATCH_SIZE).as_pymongo()
+
+
+def _iso_date(value):
+    # the form stats_import.parse_game_date reads back
+    return value.isoformat() + 'Z' if value else ''
+
+
+def _csv_rows(game):
+    row = {
+        'game_id': str(game['_id']),
+        'team_id': game.get('team_id'),
+        'opposite_team_name': game.get('opposite_team_name'),
+        'game_date': _iso_date(game.get('game_date')),
+        'team_sets_won_count': game.get('team_sets_won_count', 0),
+        'team_sets_lost_count': game.get('team_sets_lost_count', 0),
+    }
+    for set_number, score in (game.get('sets_scores') or {}).items():
+        for field in ('team_score', 'opposite_team_score'):
+            column = f'sets_scores.{set_number}.{field}'
+            if column in CSV_SET_COLUMNS:
+                row[column] = score.get(field, 0)
+
+    team_stats = game.get('team_stats') or {}
+    if not team_stats:
+        yield row
+    for player_id, player_stats in team_stats.items():
+        player_row = {**row, 'player_id': player_id, 'position': player_stats.get('position', ''), 'starter': player_stats.get('starter', True)}
+        for category, fields in COUNTER_FIELDS.items():
+            category_stats = player_stats.get(category) or {}
+            for field in fields + DERIVED_FIELDS.get(category, []):
+                player_row[f'{category}.{field}'] = category_stats.get(field, 0)
+        yield player_row
+
+
+def _ndjson_chunks(games):
+    lines = []
+    for game in games:
+        exported = serialize_game(game)
+        if game.get('game_date'):
+            exported['game_date'] = _iso_date(game['game_date'])
+        lines.append(dumps(exported) + b'\n')
+        if len(lines) >= BATCH_SIZE:
+            yield b''.join(lines)
+            lines = []
+    if lines:
+        yield b''.join(lines)
+
+
+def _csv_chunks(games):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for index, game in enumerate(games, start=1):
+        writer.writerows(_csv_rows(game))
+        if index % BATCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_team_games(team_id, export_format='ndjson', compress=False):
+    """Yields the export of a team's games chunk by chunk, so memory stays flat for any season length."""
+    if export_format not in ('ndjson', 'csv'):
+        raise ValueError("format must be ndjson or csv")
+
+    games = _team_games(team_id)
+    chunks = _csv_chunks(games) if export_format == 'csv' else _ndjson_chunks(games)
+    return _gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,53 @@
+# Counter fields of every PlayerStats category. Derived values (percentages and
+# efficiencies) are never summed, they are recomputed from these counters.
+COUNTER_FIELDS = {
+    'attack': ['attempts', 'kills', 'errors'],
+    'serve': ['attempts', 'aces', 'errors'],
+    'serve_recieves': ['attempts', 'one_balls', 'two_balls', 'three_balls', 'errors'],
+    'digs': ['attempts', 'errors'],
+    'setting': ['attempts', 'errors', 'assists'],
+    'blocks': ['attempts', 'kills', 'errors'],
+}
+
+DERIVED_FIELDS = {
+    'attack': ['kill_percentage'],
+    'serve': ['ace_percentage'],
+    'serve_recieves': ['efficiency'],
+    'digs': ['efficiency'],
+}
+
+
+def empty_totals():
+    return {category: {field: 0 for field in fields} for category, fields in COUNTER_FIELDS.items()}
+
+
+def add_player_stats(totals, player_stats, sign=1):
+    """Adds (or with sign=-1 subtracts) the counters of a raw PlayerStats dict to totals."""
+    for category, fields in COUNTER_FIELDS.items():
+        category_stats = (player_stats or {}).get(category) or {}
+        for field in fields:
+            totals[category][field] += sign * (category_stats.get(field) or 0)
+    return totals
+
+
+def _ratio(numerator, denominator, scale=1):
+    if not denominator:
+        return 0
+    return round(numerator / denominator * scale, 2)
+
+
+def compute_derived(totals):
+    """Recomputes the derived fields in place, using the same formulas as the app."""
+    attack = totals['attack']
+    attack['kill_percentage'] = _ratio(attack['kills'], attack['attempts'], 100)
+
+    serve = totals['serve']
+    serve['ace_percentage'] = _ratio(serve['aces'], serve['attempts'], 100)
+
+    receives = totals['serve_recieves']
+    receive_score = receives['one_balls'] + 2 * receives['two_balls'] + 3 * receives['three_balls'] - receives['errors']
+    receives['efficiency'] = _ratio(receive_score, receives['attempts'])
+
+    digs = totals['digs']
+    digs['efficiency'] = _ratio(digs['attempts'] - digs['errors'], digs['attempts'], 100)
+    return totals
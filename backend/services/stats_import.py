@@ -0,0 +1,159 @@
+import csv
+import datetime
+import json
+from pymongo.errors import BulkWriteError
+from models.game_statistics import GameStatistics, SetScore, PlayerStats, AttackStats, ServeStats, ServeReceivesStats, DigsStats, SettingStats, BlocksStats
+from services.stats_opponents import normalize_opponent, rebuild_opponent_index
+from services.stats_rollup import rebuild_rollups
+
+BATCH_SIZE = 500
+
+# CSV columns identifying the game a row belongs to, every other game column is taken from its first row
+CSV_GAME_KEY = ['team_id', 'opposite_team_name', 'game_date']
+CSV_GAME_COLUMNS = CSV_GAME_KEY + ['team_sets_won_count', 'team_sets_lost_count']
+# ignored on import, so exported files can be imported back
+CSV_IGNORED_COLUMNS = ['game_id', '_id', 'opponent_key', 'version']
+
+
+def parse_game_date(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, dict) and '$date' in value:
+        # {"$date": millis} of to_json() and of NDJSON exports made before they used ISO dates
+        return datetime.datetime.utcfromtimestamp(value['$date'] / 1000)
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def build_game_statistics(data):
+    """Builds an unsaved GameStatistics document from a create payload."""
+    team_id = data.get('team_id')
+    opposite_team_name = data.get('opposite_team_name')
+    game_date = parse_game_date(data.get('game_date'))
+
+    # optionals
+    team_sets_won_count = data.get('team_sets_won_count', 0)
+    team_sets_lost_count = data.get('team_sets_lost_count', 0)
+    sets_scores = {str(k): SetScore(**v) for k, v in data.get('sets_scores', {}).items()}
+    team_stats = {
+        player_id: PlayerStats(
+            position=stats.get('position', ''),
+            starter=stats.get('starter', True),
+            attack=AttackStats(**stats.get('attack', {})),
+            serve=ServeStats(**stats.get('serve', {})),
+            serve_recieves=ServeReceivesStats(**stats.get('serve_recieves', {})),
+            digs=DigsStats(**stats.get('digs', {})),
+            setting=SettingStats(**stats.get('setting', {})),
+            blocks=BlocksStats(**stats.get('blocks', {}))
+        ) for player_id, stats in data.get('team_stats', {}).items()
+    }
+
+    return GameStatistics(
+        team_id=team_id,
+        opposite_team_name=opposite_team_name,
+        opponent_key=normalize_opponent(opposite_team_name),
+        game_date=game_date,
+        team_sets_won_count=team_sets_won_count,
+        team_sets_lost_count=team_sets_lost_count,
+        sets_scores=sets_scores,
+        team_stats=team_stats
+    )
+
+
+def read_ndjson(lines):
+    """Yields (line number, game payload) for every non-empty line."""
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def _set_path(target, path, value):
+    *parents, leaf = path.split('.')
+    for part in parents:
+        target = target.setdefault(part, {})
+    target[leaf] = value
+
+
+def _csv_value(column, value):
+    if column.endswith('starter'):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return value
+
+
+def read_csv(lines):
+    """Yields (first row number, game payload), grouping consecutive rows of the same game.
+
+    Every row holds one player of a game: the game columns, a player_id column and dotted
+    stat columns such as attack.kills. Dotted sets_scores columns (sets_scores.1.team_score)
+    are read from the first row of the game.
+    """
+    game, game_key, first_row = None, None, None
+    for row_number, row in enumerate(csv.DictReader(lines), start=2):
+        # exported files carry a game_id, which also tells apart games of the same opponent on the same day
+        key = tuple(row.get(column) for column in ['game_id'] + CSV_GAME_KEY)
+        row = {column: value for column, value in row.items() if column and value not in (None, '') and column not in CSV_IGNORED_COLUMNS}
+        if key != game_key:
+            if game is not None:
+                yield first_row, game
+            game, game_key, first_row = {'team_stats': {}}, key, row_number
+            for column, value in row.items():
+                if column in CSV_GAME_COLUMNS or column.startswith('sets_scores.'):
+                    _set_path(game, column, value)
+
+        player_id = row.get('player_id')
+        if player_id:
+            player = game['team_stats'].setdefault(player_id, {})
+            for column, value in row.items():
+                if column not in CSV_GAME_COLUMNS and column != 'player_id' and not column.startswith('sets_scores.'):
+                    _set_path(player, column, _csv_value(column, value))
+
+    if game is not None:
+        yield first_row, game
+
+
+def import_games(records, team_id=None):
+    """Validates and inserts games in batches, collecting per-row errors instead of aborting.
+
+    records yields (row number, payload) pairs, payloads may be dicts or JSON strings.
+    When team_id is given every game is imported into that team.
+    """
+    collection = GameStatistics._get_collection()
+    inserted, errors, teams = 0, [], set()
+    batch, batch_rows = [], []
+
+    def flush():
+        nonlocal inserted
+        if not batch:
+            return
+        try:
+            inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            inserted += e.details.get('nInserted', 0)
+            for write_error in e.details.get('writeErrors', []):
+                errors.append({'row': batch_rows[write_error['index']], 'error': write_error.get('errmsg')})
+        batch.clear()
+        batch_rows.clear()
+
+    for row_number, payload in records:
+        try:
+            data = json.loads(payload) if isinstance(payload, str) else payload
+            if team_id:
+                data['team_id'] = team_id
+            game_statistics = build_game_statistics(data)
+            game_statistics.validate()
+        except Exception as e:
+            errors.append({'row': row_number, 'error': str(e)})
+            continue
+
+        teams.add(game_statistics.team_id)
+        batch.append(game_statistics.to_mongo().to_dict())
+        batch_rows.append(row_number)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    # refresh the derived collections once per team instead of once per game
+    for imported_team_id in teams:
+        rebuild_rollups(imported_team_id)
+        rebuild_opponent_index(imported_team_id)
+
+    return {'inserted': inserted, 'errors': errors}
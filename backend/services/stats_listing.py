@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from bson import ObjectId
+from models.game_statistics import GameStatistics
+
+SUMMARY_FIELDS = ['team_id', 'opposite_team_name', 'game_date', 'team_sets_won_count', 'team_sets_lost_count']
+SORT_OPTIONS = {
+    'game_date': 1,
+    '-game_date': -1,
+}
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(raw_game):
+    millis = int(raw_game['game_date'].replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return f"{millis}_{raw_game['_id']}"
+
+
+def decode_cursor(cursor):
+    millis, game_id = cursor.split('_')
+    if not ObjectId.is_valid(game_id):
+        raise ValueError("Invalid cursor")
+    game_date = datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc).replace(tzinfo=None)
+    return game_date, ObjectId(game_id)
+
+
+def list_team_games(team_id, fields='full', sort='-game_date', limit=None, cursor=None):
+    """Returns a page of a team's games and the cursor of the next page (None on the last page).
+
+    Games are ordered by (game_date, _id), so the cursor stays stable when several
+    games share a date, and every page is a range scan of the (team_id, game_date) index.
+    """
+    if fields not in ('full', 'summary'):
+        raise ValueError("fields must be 'full' or 'summary'")
+    if sort not in SORT_OPTIONS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_OPTIONS)}")
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    direction = SORT_OPTIONS[sort]
+    games = GameStatistics.objects(team_id=team_id)
+    if cursor:
+        game_date, game_id = decode_cursor(cursor)
+        operator = '$gt' if direction == 1 else '$lt'
+        games = games.filter(__raw__={'$or': [
+            {'game_date': {operator: game_date}},
+            {'game_date': game_date, '_id': {operator: game_id}},
+        ]})
+
+    prefix = '' if direction == 1 else '-'
+    games = games.order_by(f'{prefix}game_date', f'{prefix}id')
+    if fields == 'summary':
+        games = games.only(*SUMMARY_FIELDS)
+    if limit:
+        # fetch one extra game to know whether there is a next page
+        games = games.limit(limit + 1)
+
+    page = list(games.as_pymongo())
+    next_cursor = None
+    if limit and len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1])
+    return page, next_cursor
@@ -0,0 +1,114 @@
+import unicodedata
+from datetime import datetime
+from models.game_statistics import GameStatistics
+from models.opponent_summary import OpponentSummary
+
+SUMMARY_COUNTERS = ['games_played', 'wins', 'losses', 'sets_won', 'sets_lost', 'points_won', 'points_lost']
+
+
+def normalize_opponent(name):
+    """Canonical key of an opponent name, folding case, unicode forms and whitespace."""
+    return ' '.join(unicodedata.normalize('NFKC', name or '').casefold().split())
+
+
+def _game_record(game):
+    won = game.get('team_sets_won_count') or 0
+    lost = game.get('team_sets_lost_count') or 0
+    scores = (game.get('sets_scores') or {}).values()
+    return {
+        'games_played': 1,
+        'wins': int(won > lost),
+        'losses': int(won < lost),
+        'sets_won': won,
+        'sets_lost': lost,
+        'points_won': sum(score.get('team_score') or 0 for score in scores),
+        'points_lost': sum(score.get('opposite_team_score') or 0 for score in scores),
+    }
+
+
+def apply_opponent_delta(old_game, new_game):
+    """Moves a game's contribution between opponent summaries, like apply_game_delta does for rollups."""
+    deltas = {}
+    for game, sign in ((old_game, -1), (new_game, 1)):
+        if not game:
+            continue
+        key = (game['team_id'], normalize_opponent(game.get('opposite_team_name')))
+        delta = deltas.setdefault(key, dict.fromkeys(SUMMARY_COUNTERS, 0))
+        for counter, value in _game_record(game).items():
+            delta[counter] += sign * value
+
+    new_key = (new_game['team_id'], normalize_opponent(new_game.get('opposite_team_name'))) if new_game else None
+
+    collection = OpponentSummary._get_collection()
+    for (team_id, opponent_key), delta in deltas.items():
+        delta = {counter: value for counter, value in delta.items() if value}
+        update = {'$set': {'last_updated': datetime.utcnow()}}
+        if (team_id, opponent_key) == new_key:
+            update['$set']['opponent_name'] = new_game.get('opposite_team_name')
+        elif not delta:
+            continue
+        if delta:
+            update['$inc'] = delta
+        collection.update_one({'team_id': team_id, 'opponent_key': opponent_key}, update, upsert=(team_id, opponent_key) == new_key)
+        collection.delete_many({'team_id': team_id, 'opponent_key': opponent_key, 'games_played': {'$lte': 0}})
+
+
+def update_opponent_index(old_game, new_game):
+    # like the rollups, the index can be regenerated with `flask rebuild-opponents`
+    try:
+        apply_opponent_delta(old_game, new_game)
+    except Exception as e:
+        print(f"Error updating opponent index: {e}")
+
+
+def summary_to_dict(summary):
+    return {
+        'opponent_key': summary['opponent_key'],
+        'opponent_name': summary.get('opponent_name'),
+        **{counter: summary.get(counter, 0) for counter in SUMMARY_COUNTERS}
+    }
+
+
+def get_opponent_summaries(team_id):
+    summaries = OpponentSummary.objects(team_id=team_id).order_by('-games_played').as_pymongo()
+    return [summary_to_dict(summary) for summary in summaries]
+
+
+def get_opponent_history(team_id, opponent_name):
+    """Summary of a team against one opponent plus the list of their games, both from indexes."""
+    opponent_key = normalize_opponent(opponent_name)
+    summary = OpponentSummary.objects(team_id=team_id, opponent_key=opponent_key).as_pymongo().first()
+    if summary is None:
+        return None
+
+    games = GameStatistics.objects(team_id=team_id, opponent_key=opponent_key).order_by('-game_date').only(
+        'opposite_team_name', 'game_date', 'team_sets_won_count', 'team_sets_lost_count', 'sets_scores'
+    ).as_pymongo()
+    return {**summary_to_dict(summary), 'games': list(games)}
+
+
+def rebuild_opponent_index(team_id=None):
+    """Backfills opponent_key on every game and recomputes the opponent summaries from scratch."""
+    games = GameStatistics.objects(team_id=team_id) if team_id else GameStatistics.objects()
+    games_collection = GameStatistics._get_collection()
+
+    summaries = {}
+    for game in games.only('team_id', 'opposite_team_name', 'team_sets_won_count', 'team_sets_lost_count', 'sets_scores', 'opponent_key').as_pymongo():
+        opponent_key = normalize_opponent(game.get('opposite_team_name'))
+        if game.get('opponent_key') != opponent_key:
+            games_collection.update_one({'_id': game['_id']}, {'$set': {'opponent_key': opponent_key}})
+
+        summary = summaries.setdefault((game['team_id'], opponent_key), dict.fromkeys(SUMMARY_COUNTERS, 0))
+        summary['opponent_name'] = game.get('opposite_team_name')
+        for counter, value in _game_record(game).items():
+            summary[counter] += value
+
+    stored_summaries = OpponentSummary.objects(team_id=team_id) if team_id else OpponentSummary.objects()
+    stored_summaries.delete()
+    documents = [
+        {'team_id': summary_team_id, 'opponent_key': opponent_key, 'last_updated': datetime.utcnow(), **summary}
+        for (summary_team_id, opponent_key), summary in summaries.items()
+    ]
+    if documents:
+        OpponentSummary._get_collection().insert_many(documents)
+    return len(documents)
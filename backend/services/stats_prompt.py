@@ -0,0 +1,139 @@
+from datetime import datetime
+from models.game_statistics import GameStatistics
+from services.ai_context import count_tokens
+from services.stats_fields import COUNTER_FIELDS, DERIVED_FIELDS, add_player_stats, compute_derived, empty_totals
+from services.stats_serializer import dumps, serialize_game
+
+# Short column headers of the prompt tables, explained once in the legend
+CATEGORY_LABELS = {
+    'attack': 'attack',
+    'serve': 'serve',
+    'serve_recieves': 'receive',
+    'digs': 'dig',
+    'setting': 'set',
+    'blocks': 'block',
+}
+COLUMN_LABELS = {
+    'attempts': 'att',
+    'kills': 'k',
+    'errors': 'err',
+    'aces': 'ace',
+    'one_balls': '1',
+    'two_balls': '2',
+    'three_balls': '3',
+    'assists': 'ast',
+    'kill_percentage': 'k%',
+    'ace_percentage': 'ace%',
+    'efficiency': 'eff',
+}
+TEAM_ROW = 'TEAM'
+PROMPT_HEADER = (
+    'Volleyball game statistics as |-separated tables. Columns: att=attempts, k=kills, err=errors, '
+    'ace=aces, 1/2/3=serve receives rated 1-3, ast=assists, k%/ace%=per 100 attempts, '
+    'receive eff=(1s+2*2s+3*3s-err)/att, dig eff=% of digs without error. '
+    'Players and categories without any recorded action are omitted.'
+)
+
+
+def _number(value):
+    # 40.0 -> 40, 33.33 stays
+    return f'{value:g}' if isinstance(value, float) else str(value)
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if isinstance(value, datetime) else str(value or '')
+
+
+def _set_order(key):
+    return (0, int(key)) if str(key).isdigit() else (1, str(key))
+
+
+def _game_row(raw_game):
+    won, lost = raw_game.get('team_sets_won_count') or 0, raw_game.get('team_sets_lost_count') or 0
+    result = 'W' if won > lost else 'L' if lost > won else 'D'
+    sets = raw_game.get('sets_scores') or {}
+    scores = ' '.join(
+        f"{(sets[key] or {}).get('team_score') or 0}-{(sets[key] or {}).get('opposite_team_score') or 0}"
+        for key in sorted(sets, key=_set_order)
+    )
+    return [_date(raw_game.get('game_date')), raw_game.get('opposite_team_name') or '', f'{result} {won}-{lost}', scores]
+
+
+def _category_totals(player_stats):
+    """Counters and recomputed derived values of one raw PlayerStats dict, or of a team total."""
+    return compute_derived(add_player_stats(empty_totals(), player_stats))
+
+
+def _columns(category):
+    return COUNTER_FIELDS[category] + DERIVED_FIELDS.get(category, [])
+
+
+def _table(name, header, rows):
+    return [f'{name}: ' + '|'.join(header)] + ['|'.join(_number(value) for value in row) for row in rows]
+
+
+def encode_games(raw_games):
+    """Dense text form of raw GameStatistics dicts (from as_pymongo) for a model prompt.
+
+    One row per game, then per category one row per player that did anything in it plus
+    a team total. Percentages and efficiencies are recomputed from the counters, ids and
+    all-zero rows are dropped. A game column is only added when there are several games.
+    """
+    raw_games = list(raw_games)
+    several = len(raw_games) > 1
+    lead = ['game'] if several else []
+    lines = [PROMPT_HEADER]
+    lines += _table('games', lead + ['date', 'opponent', 'sets', 'set scores'],
+                    [([number] if several else []) + _game_row(game) for number, game in enumerate(raw_games, 1)])
+
+    roster, categories = [], {category: [] for category in COUNTER_FIELDS}
+    for number, game in enumerate(raw_games, 1):
+        game_lead = [number] if several else []
+        team = empty_totals()
+        for player_id, player_stats in sorted((game.get('team_stats') or {}).items()):
+            add_player_stats(team, player_stats)
+            totals = _category_totals(player_stats)
+            active = [category for category, fields in COUNTER_FIELDS.items() if any(totals[category][field] for field in fields)]
+            if not active:
+                continue
+            roster.append(game_lead + [player_id, player_stats.get('position') or '-', 'Y' if player_stats.get('starter', True) else 'N'])
+            for category in active:
+                categories[category].append(game_lead + [player_id] + [totals[category][field] for field in _columns(category)])
+        compute_derived(team)
+        for category in COUNTER_FIELDS:
+            if any(team[category][field] for field in COUNTER_FIELDS[category]):
+                categories[category].append(game_lead + [TEAM_ROW] + [team[category][field] for field in _columns(category)])
+
+    if roster:
+        lines += _table('players', lead + ['player', 'pos', 'starter'], roster)
+    for category, rows in categories.items():
+        if rows:
+            header = lead + ['player'] + [COLUMN_LABELS[field] for field in _columns(category)]
+            lines += _table(CATEGORY_LABELS[category], header, rows)
+    return '\n'.join(lines)
+
+
+def encode_game(raw_game):
+    return encode_games([raw_game])
+
+
+def compare_prompt_sizes(team_id):
+    """Tokens and bytes of the JSON game payload versus the compact encoding, over a team's games.
+
+    'legacy' is mongoengine's to_json(), 'json' the serialized game the advisor used to send.
+    """
+    raw_games = list(GameStatistics.objects(team_id=team_id).order_by('game_date').as_pymongo())
+    payloads = {
+        'legacy': [game.to_json() for game in GameStatistics.objects(team_id=team_id).order_by('game_date')],
+        'json': [dumps(serialize_game(game)).decode('utf-8') for game in raw_games],
+        'compact': [encode_game(game) for game in raw_games],
+    }
+    results = {'games': len(raw_games)}
+    for name, texts in payloads.items():
+        results[name] = {
+            'tokens': sum(count_tokens(text) for text in texts),
+            'bytes': sum(len(text.encode('utf-8')) for text in texts),
+        }
+    baseline = results['json']['tokens']
+    results['reduction_percent'] = round((1 - results['compact']['tokens'] / baseline) * 100, 1) if baseline else 0
+    return results
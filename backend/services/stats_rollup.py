@@ -0,0 +1,118 @@
+from datetime import datetime
+from models.game_statistics import GameStatistics
+from models.player_season_rollup import PlayerSeasonRollup
+from services.stats_fields import COUNTER_FIELDS, empty_totals, add_player_stats, compute_derived
+
+
+def season_for(game_date):
+    """Season key of a game, rollups are kept per calendar year of the game date."""
+    return str(game_date.year)
+
+
+def _player_delta(old_stats, new_stats):
+    delta = {'games_played': int(new_stats is not None) - int(old_stats is not None)}
+    totals = add_player_stats(add_player_stats(empty_totals(), new_stats), old_stats, sign=-1)
+    for category, fields in COUNTER_FIELDS.items():
+        for field in fields:
+            delta[f'{category}.{field}'] = totals[category][field]
+    return {path: value for path, value in delta.items() if value}
+
+
+def apply_game_delta(old_game, new_game):
+    """Updates the rollups with the difference between two raw GameStatistics dicts.
+
+    Pass old_game=None for a created game and new_game=None for a deleted one.
+    """
+    game = new_game or old_game
+    if not game:
+        return
+
+    team_id = game['team_id']
+    season = season_for(game['game_date'])
+    old_team_stats = (old_game or {}).get('team_stats') or {}
+    new_team_stats = (new_game or {}).get('team_stats') or {}
+
+    collection = PlayerSeasonRollup._get_collection()
+    for player_id in set(old_team_stats) | set(new_team_stats):
+        delta = _player_delta(old_team_stats.get(player_id), new_team_stats.get(player_id))
+        if not delta:
+            continue
+        collection.update_one(
+            {'team_id': team_id, 'season': season, 'player_id': player_id},
+            {'$inc': delta, '$set': {'last_updated': datetime.utcnow()}},
+            upsert=True
+        )
+
+    # drop rollups of players that no longer appear in any game of the season
+    collection.delete_many({'team_id': team_id, 'season': season, 'games_played': {'$lte': 0}})
+
+
+def update_rollups(old_game, new_game):
+    # rollups can always be regenerated with `flask rebuild-rollups`, so a failure here must not fail the write
+    try:
+        apply_game_delta(old_game, new_game)
+    except Exception as e:
+        print(f"Error updating player season rollups: {e}")
+
+
+def rollup_to_dict(rollup):
+    totals = empty_totals()
+    add_player_stats(totals, rollup)
+    return {
+        'player_id': rollup['player_id'],
+        'season': rollup['season'],
+        'games_played': rollup.get('games_played', 0),
+        **compute_derived(totals)
+    }
+
+
+def get_team_rollups(team_id, season=None):
+    filters = {'team_id': team_id}
+    if season:
+        filters['season'] = season
+    return [rollup_to_dict(rollup) for rollup in PlayerSeasonRollup.objects(**filters).as_pymongo()]
+
+
+def compute_rollups(team_id=None):
+    """Recomputes every rollup from scratch, keyed by (team_id, season, player_id)."""
+    games = GameStatistics.objects(team_id=team_id) if team_id else GameStatistics.objects()
+    rollups = {}
+    for game in games.only('team_id', 'game_date', 'team_stats').as_pymongo():
+        season = season_for(game['game_date'])
+        for player_id, player_stats in (game.get('team_stats') or {}).items():
+            key = (game['team_id'], season, player_id)
+            rollup = rollups.setdefault(key, {'games_played': 0, **empty_totals()})
+            rollup['games_played'] += 1
+            add_player_stats(rollup, player_stats)
+    return rollups
+
+
+def _stored_counters(rollup):
+    counters = {'games_played': rollup.get('games_played', 0)}
+    counters.update(add_player_stats(empty_totals(), rollup))
+    return counters
+
+
+def verify_rollups(team_id=None):
+    """Returns the (team_id, season, player_id) keys whose stored rollup differs from the games."""
+    expected = compute_rollups(team_id)
+    stored_rollups = PlayerSeasonRollup.objects(team_id=team_id) if team_id else PlayerSeasonRollup.objects()
+    stored = {
+        (rollup['team_id'], rollup['season'], rollup['player_id']): _stored_counters(rollup)
+        for rollup in stored_rollups.as_pymongo()
+    }
+    return sorted(key for key in set(expected) | set(stored) if expected.get(key) != stored.get(key))
+
+
+def rebuild_rollups(team_id=None):
+    rollups = compute_rollups(team_id)
+    stored_rollups = PlayerSeasonRollup.objects(team_id=team_id) if team_id else PlayerSeasonRollup.objects()
+    stored_rollups.delete()
+
+    documents = [
+        {'team_id': rollup_team_id, 'season': season, 'player_id': player_id, 'last_updated': datetime.utcnow(), **counters}
+        for (rollup_team_id, season, player_id), counters in rollups.items()
+    ]
+    if documents:
+        PlayerSeasonRollup._get_collection().insert_many(documents)
+    return len(documents)
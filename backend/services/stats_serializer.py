@@ -0,0 +1,102 @@
+import calendar
+import json
+import time
+from datetime import datetime
+from bson import ObjectId
+from flask import current_app
+from models.game_statistics import GameStatistics
+from services.stats_fields import COUNTER_FIELDS, DERIVED_FIELDS, add_player_stats, compute_derived, empty_totals
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Encodes obj to JSON bytes, with orjson when it's installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    return current_app.response_class(dumps(obj), status=status, mimetype='application/json')
+
+
+def _epoch_millis(value):
+    return calendar.timegm(value.utctimetuple()) * 1000 + value.microsecond // 1000
+
+
+def _complete_player_stats(player_stats):
+    """A raw PlayerStats dict with every category and field, as mongoengine's defaults would give.
+
+    Players written by the $set/$inc update paths only carry the fields that were touched,
+    missing derived values are recomputed from the counters.
+    """
+    player = dict(player_stats or {})
+    player.setdefault('position', '')
+    player.setdefault('starter', True)
+    totals = compute_derived(add_player_stats(empty_totals(), player))
+    for category, fields in COUNTER_FIELDS.items():
+        category_stats = dict(player.get(category) or {})
+        for field in fields + DERIVED_FIELDS.get(category, []):
+            category_stats.setdefault(field, totals[category][field])
+        player[category] = category_stats
+    return player
+
+
+def serialize_game(raw_game):
+    """Converts a raw GameStatistics dict (from as_pymongo) into a response object.
+
+    The {"$oid"} / {"$date"} wrappers of mongoengine's to_json() are kept, since the
+    app reads the game id and date from them. as_pymongo() skips the model defaults,
+    so partially written players and sets are completed here.
+    """
+    game = dict(raw_game)
+    if 'team_stats' in raw_game:
+        game['team_stats'] = {
+            player_id: _complete_player_stats(player_stats) for player_id, player_stats in (raw_game['team_stats'] or {}).items()
+        }
+    if 'sets_scores' in raw_game:
+        game['sets_scores'] = {
+            set_key: {'team_score': 0, 'opposite_team_score': 0, **(set_score or {})}
+            for set_key, set_score in (raw_game['sets_scores'] or {}).items()
+        }
+    game['_id'] = {'$oid': str(raw_game['_id'])}
+    if isinstance(raw_game.get('game_date'), datetime):
+        game['game_date'] = {'$date': _epoch_millis(raw_game['game_date'])}
+    return game
+
+
+def serialize_games(raw_games):
+    return [serialize_game(raw_game) for raw_game in raw_games]
+
+
+def benchmark_serializers(team_id, repeat=20):
+    """Times the old to_json() + jsonify path against as_pymongo() + serialize_games() + dumps()."""
+    def legacy():
+        # to_json() followed by encoding the resulting string again
+        return json.dumps({"stats": GameStatistics.objects(team_id=team_id).to_json()})
+
+    def fast():
+        return dumps({"stats": serialize_games(GameStatistics.objects(team_id=team_id).as_pymongo())})
+
+    results = {}
+    for name, encode in (('legacy', legacy), ('fast', fast)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            payload = encode()
+        results[name] = {
+            'avg_ms': round((time.perf_counter() - start) / repeat * 1000, 3),
+            'bytes': len(payload),
+        }
+    return results
@@ -0,0 +1,201 @@
+import copy
+import mongoengine as me
+from bson import ObjectId
+from pymongo import ReturnDocument
+from models.game_statistics import GameStatistics, SetScore, PlayerStats
+from services.stats_fields import DERIVED_FIELDS, compute_derived, empty_totals, add_player_stats
+from services.stats_rollup import update_rollups
+from services.stats_opponents import normalize_opponent, update_opponent_index
+
+# Fields that cannot be modified
+IMMUTABLE_FIELDS = ['_id', 'id', 'game_date', 'team_id', 'version', 'opponent_key']
+
+
+# Concurrent updates a percentage recompute is retried against before giving up
+MAX_DERIVED_ATTEMPTS = 5
+
+
+class VersionConflict(Exception):
+    pass
+
+
+def check_key(key):
+    if not isinstance(key, str) or not key or '.' in key or key.startswith('$'):
+        raise ValueError(f"Invalid key: {key!r}")
+
+
+def _embedded_operators(document_class, values, path, operators, numeric_only=False):
+    """Flattens a nested dict into dotted paths, validating every value against the schema."""
+    for key, value in values.items():
+        field = document_class._fields.get(key)
+        if field is None:
+            raise ValueError(f"Unknown field: {path}.{key}")
+
+        if isinstance(field, me.EmbeddedDocumentField):
+            if not isinstance(value, dict):
+                raise ValueError(f"{path}.{key} must be an object")
+            _embedded_operators(field.document_type, value, f'{path}.{key}', operators, numeric_only)
+            continue
+
+        if numeric_only and not isinstance(field, (me.IntField, me.FloatField)):
+            raise ValueError(f"{path}.{key} can't be incremented")
+        value = field.to_python(value)
+        field.validate(value)
+        operators[f'{path}.{key}'] = field.to_mongo(value)
+
+
+def build_set_operators(data):
+    """Translates an update payload into a $set document of targeted paths."""
+    operators = {}
+    for key, value in data.items():
+        if key in IMMUTABLE_FIELDS or key == 'increments':
+            continue
+
+        if key == 'sets_scores':
+            # sets_scores is small and sent in full, so it replaces the stored map
+            operators['sets_scores'] = {}
+            for set_number, score in value.items():
+                set_score = SetScore(**score)
+                set_score.validate()
+                operators['sets_scores'][str(set_number)] = set_score.to_mongo().to_dict()
+        elif key == 'team_stats':
+            for player_id, player_stats in value.items():
+                check_key(player_id)
+                _embedded_operators(PlayerStats, player_stats, f'team_stats.{player_id}', operators)
+        else:
+            field = GameStatistics._fields.get(key)
+            if field is None:
+                raise ValueError(f"Unknown field: {key}")
+            value = field.to_python(value)
+            field.validate(value)
+            operators[key] = field.to_mongo(value)
+            if key == 'opposite_team_name':
+                operators['opponent_key'] = normalize_opponent(value)
+    return operators
+
+
+def build_inc_operators(increments):
+    """Translates {"team_stats": {"<player>": {"attack": {"kills": 1}}}} style increments into $inc paths."""
+    operators = {}
+    for key, value in (increments or {}).items():
+        if key == 'team_stats':
+            for player_id, player_stats in value.items():
+                check_key(player_id)
+                _embedded_operators(PlayerStats, player_stats, f'team_stats.{player_id}', operators, numeric_only=True)
+        elif key in ('team_sets_won_count', 'team_sets_lost_count'):
+            operators[key] = int(value)
+        else:
+            raise ValueError(f"{key} can't be incremented")
+    return operators
+
+
+def apply_operators(raw_game, set_operators, inc_operators):
+    """Returns a copy of a raw game dict with the $set and $inc operators applied, as Mongo would."""
+    game = copy.deepcopy(raw_game)
+    for operators, increment in ((set_operators, False), (inc_operators, True)):
+        for path, value in operators.items():
+            *parents, leaf = path.split('.')
+            target = game
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = (target.get(leaf) or 0) + value if increment else value
+    return game
+
+
+def touched_players(set_operators, inc_operators):
+    players = set()
+    for path in list(set_operators) + list(inc_operators):
+        if path.startswith('team_stats.'):
+            players.add(path.split('.')[1])
+    return players
+
+
+def derived_operators(raw_game, player_ids):
+    """$set paths of the recomputed percentages of the given players."""
+    operators = {}
+    for player_id in player_ids:
+        if player_id not in (raw_game.get('team_stats') or {}):
+            continue
+        totals = compute_derived(add_player_stats(empty_totals(), raw_game['team_stats'][player_id]))
+        for category, fields in DERIVED_FIELDS.items():
+            for field in fields:
+                operators[f'team_stats.{player_id}.{category}.{field}'] = totals[category][field]
+    return operators
+
+
+def recompute_derived(game_id, raw_game, player_ids):
+    """Stores the recomputed percentages of the given players of raw_game.
+
+    The write only applies to the version they were computed from, so it never overwrites
+    values of newer counters. When another update got in between, the percentages are
+    recomputed from the current document and written again.
+    """
+    collection = GameStatistics._get_collection()
+    for _ in range(MAX_DERIVED_ATTEMPTS):
+        recomputed = derived_operators(raw_game, player_ids)
+        if not recomputed:
+            return
+        result = collection.update_one({'_id': ObjectId(game_id), 'version': raw_game.get('version')}, {'$set': recomputed})
+        if result.matched_count:
+            return
+        raw_game = collection.find_one({'_id': ObjectId(game_id)})
+        if raw_game is None:
+            return
+    print(f"Gave up recomputing the percentages of game {game_id} after {MAX_DERIVED_ATTEMPTS} attempts")
+
+
+def apply_game_update(game_id, set_operators, inc_operators, expected_version=None):
+    """Applies the operators to a game in a single atomic update.
+
+    Returns the (old, new) raw documents, or None when the game doesn't exist. When
+    expected_version is given the update only applies on top of that version.
+    """
+    query = {'_id': ObjectId(game_id)}
+    if expected_version is not None:
+        query['version'] = {'$in': [0, None]} if expected_version == 0 else expected_version
+
+    update = {'$inc': {**inc_operators, 'version': 1}}
+    if set_operators:
+        update['$set'] = set_operators
+
+    collection = GameStatistics._get_collection()
+    old_game = collection.find_one_and_update(query, update, return_document=ReturnDocument.BEFORE)
+    if old_game is None:
+        if expected_version is not None and collection.count_documents({'_id': ObjectId(game_id)}, limit=1):
+            raise VersionConflict("Game statistics were modified by another update")
+        return None
+
+    new_game = apply_operators(old_game, set_operators, inc_operators)
+    new_game['version'] = (old_game.get('version') or 0) + 1
+    return old_game, new_game
+
+
+def finish_game_update(game_id, old_game, new_game, player_ids):
+    """Follow-up writes of an applied update: percentages, rollups and the opponent index.
+
+    The update itself is already committed, so failures are logged rather than raised;
+    a caller retrying the whole update would apply its increments twice.
+    """
+    steps = (
+        ('percentages', lambda: recompute_derived(game_id, new_game, player_ids)),
+        # the rollups diff old_game and new_game, so new_game stays this update's result
+        ('rollups', lambda: update_rollups(old_game, new_game)),
+        ('opponent index', lambda: update_opponent_index(old_game, new_game)),
+    )
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            print(f"Error updating the {name} of game {game_id}: {e}")
+
+
+def update_game(game_id, set_operators, inc_operators, expected_version=None):
+    """Applies the operators to a game and updates what's derived from it.
+
+    Returns the (old, new) raw documents, or None when the game doesn't exist. Only
+    raises when the update itself wasn't applied.
+    """
+    result = apply_game_update(game_id, set_operators, inc_operators, expected_version)
+    if result is not None:
+        finish_game_update(game_id, *result, touched_players(set_operators, inc_operators))
+    return result
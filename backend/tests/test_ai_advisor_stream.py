@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import openai
+from flask import Flask
+
+from controllers import ai_advior
+from routes.ai_advior import ai_advior_bp
+
+DELTAS = ['Serve ', 'more ', 'aggressively.']
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    """Answers chat completions like OpenAI with stream=True: chunked `data:` deltas ending in [DONE]."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+
+        if self.server.failing:
+            payload = json.dumps({'error': {'message': 'upstream unavailable', 'type': 'server_error'}}).encode('utf-8')
+            self.send_response(500)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self._write_event({'choices': [{'index': 0, 'delta': {'role': 'assistant'}}]})
+        for delta in DELTAS:
+            self._write_event({'choices': [{'index': 0, 'delta': {'content': delta}}]})
+        self._write_chunk('data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_event(self, data):
+        self._write_chunk(f'data: {json.dumps(data)}\n\n')
+
+    def _write_chunk(self, text):
+        payload = text.encode('utf-8')
+        self.wfile.write(f'{len(payload):x}\r\n'.encode('ascii') + payload + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def parse_events(text):
+    """(event type, data) of every SSE event, 'message' when no type is given."""
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+class StreamAiAdvisorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCompletionHandler)
+        self.server.requests = []
+        self.server.failing = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.conversation = mock.Mock(summary=None, summary_upto=0)
+        self.append_turns = mock.Mock()
+        patches = [
+            mock.patch.object(openai, 'api_base', f'http://127.0.0.1:{self.server.server_port}/v1'),
+            mock.patch.object(openai, 'api_key', 'test-key'),
+            mock.patch.dict(os.environ, {'OPENAI_ENGINE': 'gpt-3.5-turbo'}),
+            mock.patch.object(ai_advior, 'get_conversation', return_value=self.conversation),
+            mock.patch.object(ai_advior, 'advisor_context', return_value=[{'role': 'system', 'content': 'coach'}]),
+            mock.patch.object(ai_advior, 'append_turns', self.append_turns),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        app = Flask(__name__)
+        app.register_blueprint(ai_advior_bp, url_prefix='/ai_advior')
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post_question(self):
+        return self.client.post('/ai_advior/message_ai_advisor/stream', json={
+            'email': 'coach@example.com', 'user_type': 'management', 'type': 'text', 'message': 'How do we serve?'
+        })
+
+    def test_deltas_arrive_in_order_and_done_carries_the_message(self):
+        response = self.post_question()
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = parse_events(response.get_data(as_text=True))
+        self.assertEqual(events[:-1], [('message', {'delta': delta}) for delta in DELTAS])
+        self.assertEqual(events[-1], ('done', {'message': ''.join(DELTAS)}))
+        self.assertTrue(self.server.requests[0]['stream'])
+
+    def test_turns_are_saved_only_once_the_stream_completes(self):
+        response = self.post_question()
+        chunks = iter(response.response)  # the event stream, read one event at a time
+
+        for delta in DELTAS:
+            self.assertEqual(next(chunks).decode('utf-8'), f"data: {json.dumps({'delta': delta})}\n\n")
+            self.append_turns.assert_not_called()
+        self.assertIn('event: done', b''.join(chunks).decode('utf-8'))
+
+        self.append_turns.assert_called_once()
+        conversation, turns = self.append_turns.call_args[0]
+        self.assertIs(conversation, self.conversation)
+        self.assertEqual([(turn['role'], turn['content']) for turn in turns], [
+            ('user', 'How do we serve?'),
+            ('assistant', ''.join(DELTAS)),
+        ])
+
+    def test_failing_upstream_sends_an_error_event_and_saves_nothing(self):
+        self.server.failing = True
+
+        events = parse_events(self.post_question().get_data(as_text=True))
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(events, [('error', {'error': 'Failed to get a response'})])
+        self.append_turns.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
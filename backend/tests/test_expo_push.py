@@ -0,0 +1,99 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from services import expo_push
+
+
+class FakeExpoHandler(BaseHTTPRequestHandler):
+    """Answers push sends like Expo: one ticket per message, in order."""
+    protocol_version = 'HTTP/1.1'  # keep-alive, so reused connections are visible
+
+    def do_POST(self):
+        messages = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append({'size': len(messages), 'client_port': self.client_address[1]})
+
+        if any(message['to'] in self.server.failing_tokens for message in messages):
+            self._reply(400, {'errors': [{'message': 'bad request'}]})
+            return
+        tickets = []
+        for message in messages:
+            if message['to'].endswith('bad]'):
+                tickets.append({'status': 'error', 'message': 'not registered', 'details': {'error': 'DeviceNotRegistered'}})
+            else:
+                tickets.append({'status': 'ok', 'id': f"ticket-{message['to']}"})
+        self._reply(200, {'data': tickets})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def push_messages(count, prefix='user'):
+    return [{'to': f'ExponentPushToken[{prefix}{number}]', 'title': 'Title', 'body': 'Body'} for number in range(count)]
+
+
+class SendPushMessagesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeExpoHandler)
+        self.server.requests = []
+        self.server.failing_tokens = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        url = f'http://127.0.0.1:{self.server.server_port}/--/api/v2/push/send'
+        for name, value in (('EXPO_PUSH_URL', url), ('EXPO_MAX_RETRIES', 0), ('_session', None)):
+            patcher = mock.patch.object(expo_push, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_messages_are_sent_in_chunks_of_100(self):
+        results = expo_push.send_push_messages(push_messages(250), concurrency=1)
+
+        self.assertEqual([request['size'] for request in self.server.requests], [100, 100, 50])
+        self.assertEqual(len(results), 250)
+
+    def test_batches_reuse_the_pooled_session(self):
+        expo_push.send_push_messages(push_messages(300), concurrency=1)
+
+        self.assertIs(expo_push.get_session(), expo_push.get_session())
+        # every batch went over the same keep-alive connection
+        self.assertEqual(len({request['client_port'] for request in self.server.requests}), 1)
+
+    def test_results_map_to_their_recipients(self):
+        messages = push_messages(3)
+        messages[1]['to'] = 'ExponentPushToken[bad]'
+
+        results = expo_push.send_push_messages(messages)
+
+        self.assertEqual([result['to'] for result in results], [message['to'] for message in messages])
+        self.assertEqual(results[0], {'to': messages[0]['to'], 'status': 'ok', 'id': f"ticket-{messages[0]['to']}"})
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertEqual(results[1]['details'], {'error': 'DeviceNotRegistered'})
+
+    def test_http_error_fails_only_the_recipients_of_its_chunk(self):
+        messages = push_messages(150)
+        self.server.failing_tokens.add(messages[120]['to'])
+
+        results = expo_push.send_push_messages(messages, concurrency=2)
+
+        self.assertEqual([result['to'] for result in results], [message['to'] for message in messages])
+        self.assertTrue(all(result['status'] == 'ok' for result in results[:100]))
+        self.assertTrue(all(result['status'] == 'error' and result['message'] == 'bad request' for result in results[100:]))
+
+
+if __name__ == '__main__':
+    unittest.main()